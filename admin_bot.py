@@ -1,9 +1,16 @@
 import os
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Updater, CommandHandler, CallbackContext, CallbackQueryHandler
-import json
+from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from datetime import datetime
+import order_store
+import dispatch
+import outbox
+import notify
+import webhook
+import menu
+from menu import item_name
+from render_cache import cached_view, user_locale
 
 # Setup logging
 logging.basicConfig(
@@ -18,31 +25,45 @@ ADMIN_IDS = [7521156999] # Ganti dengan ID admin sebenarnya
 # File untuk menyimpan orders (simulasi database)
 ORDERS_FILE = 'orders.json'
 
+# Token bot admin. Kosong -> pakai BOT_TOKEN (bot customer) seperti dulu.
+# Dengan UPDATE_MODE=webhook wajib diisi token bot lain (buat lewat @BotFather):
+# satu token hanya punya satu cara menerima update, dan polling dari proses
+# admin akan menghapus webhook bot customer
+ADMIN_BOT_TOKEN = os.getenv('ADMIN_BOT_TOKEN')
+
+# Seberapa sering (detik) file menu dicek untuk perubahan
+MENU_RELOAD_SECONDS = int(os.getenv('MENU_RELOAD_SECONDS', '10'))
+
+# ORDER_STORAGE selects the backend: json (default), journal or sqlite
+orders_store = order_store.open_store(ORDERS_FILE)
+# Old completed orders, read only when a handler asks for them
+order_archive = order_store.OrderArchive()
+
 def load_orders():
-    """Load orders from JSON file"""
-    try:
-        with open(ORDERS_FILE, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+    """Load orders from the order store"""
+    return orders_store.load()
 
 def save_orders(orders):
-    """Save orders to JSON file"""
-    with open(ORDERS_FILE, 'w') as f:
-        json.dump(orders, f, indent=2)
+    """Replace all orders in the order store"""
+    orders_store.save(orders)
+
+def find_order(order_id):
+    """Find an order in the order store, then in the archive"""
+    order = orders_store.get_order(order_id)
+    if order is None:
+        order = order_archive.get_order(order_id)
+    return order
+
+# NOTIFY_CUSTOMERS=on: customers get a message when an admin changes their order status
+status_notifier = notify.open_notifier(find_order)
 
 def is_admin(user_id):
     """Check if user is admin"""
     return user_id in ADMIN_IDS
 
-def admin_start(update: Update, context: CallbackContext):
-    """Admin panel start"""
-    user_id = update.effective_user.id
-    
-    if not is_admin(user_id):
-        update.message.reply_text("❌ Akses ditolak. Hanya admin yang bisa mengakses.")
-        return
-    
+@cached_view
+def admin_start_view(locale):
+    """Admin dashboard screen as (text, reply_markup)"""
     keyboard = [
         [InlineKeyboardButton("📊 DAFTAR PESANAN", callback_data="admin_list_orders")],
         [InlineKeyboardButton("⏳ PESANAN BARU", callback_data="admin_new_orders")],
@@ -66,6 +87,17 @@ Selamat datang di Admin Panel!
 • ✅ Lihat pesanan selesai
 • 📈 Lihat statistik penjualan
     """
+    return text, reply_markup
+
+def admin_start(update: Update, context: CallbackContext):
+    """Admin panel start"""
+    user_id = update.effective_user.id
+    
+    if not is_admin(user_id):
+        update.message.reply_text("❌ Akses ditolak. Hanya admin yang bisa mengakses.")
+        return
+    
+    text, reply_markup = admin_start_view(user_locale(update.effective_user))
     
     update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
 
@@ -78,9 +110,11 @@ def admin_list_orders(update: Update, context: CallbackContext):
         query.answer("Akses ditolak")
         return
     
-    orders = load_orders()
+    status_counts = orders_store.count_by_status()
+    # Completed orders moved to the archive still count towards the total
+    archived_orders = order_archive.totals(datetime.now().date().isoformat())['total_orders']
     
-    if not orders:
+    if not status_counts and not archived_orders:
         query.edit_message_text("📭 Tidak ada pesanan")
         return
     
@@ -94,9 +128,9 @@ def admin_list_orders(update: Update, context: CallbackContext):
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    total_orders = len(orders)
-    new_orders = sum(1 for o in orders.values() if o['status'] == 'baru')
-    processing_orders = sum(1 for o in orders.values() if o['status'] == 'diproses')
+    total_orders = sum(status_counts.values()) + archived_orders
+    new_orders = status_counts.get('baru', 0)
+    processing_orders = status_counts.get('diproses', 0)
     
     text = f"""
 📊 **DAFTAR PESANAN**
@@ -120,12 +154,10 @@ def admin_show_orders(update: Update, context: CallbackContext, status_filter=No
         query.answer("Akses ditolak")
         return
     
-    orders = load_orders()
-    
     if status_filter and status_filter != 'all':
-        filtered_orders = {k: v for k, v in orders.items() if v['status'] == status_filter}
+        filtered_orders = orders_store.orders_by_status(status_filter)
     else:
-        filtered_orders = orders
+        filtered_orders = load_orders()
     
     if not filtered_orders:
         status_text = {
@@ -197,7 +229,8 @@ def admin_show_orders(update: Update, context: CallbackContext, status_filter=No
 
 def format_order_detail(order_id, order):
     """Format order details for display"""
-    items_text = "\n".join([f"• {item['name']} - Rp {item['price']:,}" for item in order['items']])
+    items_text = "\n".join([f"• {item_name(item_id)} x{qty} - Rp {price * qty:,}"
+                            for item_id, qty, price in order['items']])
     
     status_emoji = {
         'baru': '🆕',
@@ -242,19 +275,16 @@ def admin_update_status(update: Update, context: CallbackContext):
         'completed': 'selesai'
     }
     
-    orders = load_orders()
+    old_status = orders_store.update_status(order_id, status_map[new_status])
     
-    if order_id not in orders:
+    if old_status is None:
         query.answer("Pesanan tidak ditemukan")
         return
     
-    old_status = orders[order_id]['status']
-    orders[order_id]['status'] = status_map[new_status]
-    
-    save_orders(orders)
-    
-    # Notify customer (in real implementation, you'd send message to customer)
     logger.info(f"Order {order_id} status changed from {old_status} to {status_map[new_status]}")
+    # The customer is told from the notifier thread; this tap does not wait for it
+    if status_notifier is not None:
+        status_notifier.status_changed(order_id, old_status, status_map[new_status])
     
     query.answer(f"✅ Status diupdate ke {status_map[new_status].title()}")
     
@@ -285,9 +315,12 @@ def admin_navigate_orders(update: Update, context: CallbackContext):
     context.user_data['current_order_index'] = current_index
     
     # Reload with new index
-    orders = load_orders()
     order_id = order_ids[current_index]
-    order = orders[order_id]
+    order = orders_store.get_order(order_id)
+    
+    if order is None:
+        query.answer("Pesanan tidak ditemukan")
+        return
     
     text = format_order_detail(order_id, order)
     
@@ -333,25 +366,37 @@ def admin_stats(update: Update, context: CallbackContext):
         query.answer("Akses ditolak")
         return
     
-    orders = load_orders()
-    
-    if not orders:
-        query.edit_message_text("📊 Belum ada data statistik")
+    # Today's orders
+    today = datetime.now().date().isoformat()
+    stats = orders_store.stats(today)
+    
+    # Archived orders (all completed) count too; their totals come from the
+    # archive index, the partitions themselves are not read
+    archived = order_archive.totals(today)
+    stats['total_orders'] += archived['total_orders']
+    stats['total_revenue'] += archived['total_revenue']
+    stats['day_orders'] += archived['day_orders']
+    stats['day_revenue'] += archived['day_revenue']
+    stats['status_counts']['selesai'] = stats['status_counts'].get('selesai', 0) + archived['total_orders']
+    
+    if not stats['total_orders']:
+        query.edit_message_text("📊 Belum ada data statistik", reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("🔙 Dashboard", callback_data="admin_back_dashboard")]
+        ]))
         return
     
-    # Calculate stats
-    total_orders = len(orders)
-    total_revenue = sum(order['total'] for order in orders.values())
+    total_orders = stats['total_orders']
+    total_revenue = stats['total_revenue']
+    status_counts = stats['status_counts']
+    today_orders = stats['day_orders']
+    today_revenue = stats['day_revenue']
     
-    status_counts = {}
-    for order in orders.values():
-        status = order['status']
-        status_counts[status] = status_counts.get(status, 0) + 1
-    
-    # Today's orders
-    today = datetime.now().date().isoformat()
-    today_orders = sum(1 for order in orders.values() if order['timestamp'].startswith(today))
-    today_revenue = sum(order['total'] for order in orders.values() if order['timestamp'].startswith(today))
+    day_hours = stats['day_hours']
+    if day_hours:
+        peak_hour = max(day_hours, key=lambda hour: day_hours[hour][0])
+        peak_text = f"{peak_hour}:00 ({day_hours[peak_hour][0]} pesanan)"
+    else:
+        peak_text = "-"
     
     text = f"""
 📈 **STATISTIK RESTORAN**
@@ -359,6 +404,7 @@ def admin_stats(update: Update, context: CallbackContext):
 📅 **Hari Ini:**
 • Pesanan: {today_orders}
 • Pendapatan: Rp {today_revenue:,}
+• Jam Tersibuk: {peak_text}
 
 📊 **Total:**
 • Total Pesanan: {total_orders}
@@ -389,14 +435,12 @@ def admin_contact_customer(update: Update, context: CallbackContext):
         return
     
     order_id = query.data.split('_')[-1]
-    orders = load_orders()
+    order = find_order(order_id)
     
-    if order_id not in orders:
+    if order is None:
         query.answer("Pesanan tidak ditemukan")
         return
     
-    order = orders[order_id]
-    
     text = f"""
 📞 **KONTAK CUSTOMER**
 
@@ -436,7 +480,8 @@ def admin_button_handler(update: Update, context: CallbackContext):
         admin_show_orders(update, context, 'dikirim')
     elif data == "admin_completed_orders":
         admin_show_orders(update, context, 'selesai')
-    elif data == "admin_stats":
+    elif data in ("admin_stats", "admin_stats_archive"):
+        # admin_stats_archive: the former "Termasuk Arsip" button on older messages
         admin_stats(update, context)
     elif data.startswith("admin_filter_"):
         filter_type = data.replace('admin_filter_', '')
@@ -452,9 +497,13 @@ def admin_button_handler(update: Update, context: CallbackContext):
         admin_contact_customer(update, context)
     elif data.startswith("admin_back_to_order_"):
         order_id = data.replace('admin_back_to_order_', '')
-        orders = load_orders()
-        if order_id in orders:
-            admin_show_orders(update, context, orders[order_id]['status'])
+        order = find_order(order_id)
+        if order is not None:
+            admin_show_orders(update, context, order['status'])
+
+def reload_menu(context: CallbackContext):
+    """Periodic job: pick up edits to the menu file without a restart"""
+    menu.reload_menu()
 
 def main():
     """Main admin bot"""
@@ -464,22 +513,46 @@ def main():
         logger.error("❌ BOT_TOKEN not found!")
         return
     
+    # The admin bot always polls; polling the customer bot's token would delete its webhook
+    admin_token = ADMIN_BOT_TOKEN or BOT_TOKEN
+    if webhook.UPDATE_MODE == 'webhook' and admin_token == BOT_TOKEN:
+        logger.error("❌ UPDATE_MODE=webhook needs ADMIN_BOT_TOKEN: a separate bot token for the admin bot")
+        return
+    
     # Update ADMIN_IDS dengan ID Telegram Anda
     global ADMIN_IDS
     # Ganti dengan ID Telegram admin sebenarnya
     # Cara dapatkan ID Telegram: kirim message ke @userinfobot di Telegram
     ADMIN_IDS = [7521156999] # GANTI DENGAN ID ANDA
     
-    updater = Updater(BOT_TOKEN, use_context=True)
+    # SEND_QUEUE=on: messages go out through a rate-limited send queue
+    send_queue = outbox.open_outbox()
+    updater = dispatch.make_updater(admin_token, workers=1, send_queue=send_queue)
+    if status_notifier is not None:
+        # Customers only get messages from the bot they started: notify through the customer bot
+        customer_bot = updater.bot
+        if admin_token != BOT_TOKEN:
+            customer_bot = outbox.QueuedBot(BOT_TOKEN, request=dispatch.make_request(outbox.SEND_THREADS), outbox=send_queue)
+        status_notifier.start(customer_bot)
     dispatcher = updater.dispatcher
     
     # Admin handlers
     dispatcher.add_handler(CommandHandler("admin", admin_start))
     dispatcher.add_handler(CallbackQueryHandler(admin_button_handler, pattern="^admin_"))
     
+    # Item names in order details follow edits to the menu file
+    updater.job_queue.run_repeating(reload_menu, interval=MENU_RELOAD_SECONDS, first=MENU_RELOAD_SECONDS)
+    
     logger.info("👑 Admin Bot is running...")
     updater.start_polling()
     updater.idle()
+    
+    # Send what is still queued, then commit changes still waiting in the commit window
+    if status_notifier is not None:
+        status_notifier.close()
+    if send_queue is not None:
+        send_queue.close()
+    orders_store.flush()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""Checkout latency vs store size.
+
+One checkout is one insert_order. The old checkout also read the orders
+back from the file (a fresh parse), shown here as "with read-back".
+
+    ORDER_FSYNC=never python bench/checkout.py [json|journal|sqlite]
+"""
+import os
+import sys
+import time
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('MENU_FILE', os.path.join(ROOT, 'menu.json'))
+
+import order_store
+
+CHECKOUTS = 50
+
+
+def open_store(kind, directory):
+    path = os.path.join(directory, 'orders.json')
+    if kind == 'journal':
+        return order_store.JournalOrderStore(path)
+    if kind == 'sqlite':
+        return order_store.SqliteOrderStore(os.path.join(directory, 'orders.db'))
+    return order_store.JsonOrderStore(path)
+
+
+def order(n):
+    return order_store.Order(order_id='', user_id=n, customer_name='Budi Santoso', phone='081234567890',
+                             address='Jl. Mawar No. 12', items=[['M001', 2, 25000], ['D001', 1, 5000]],
+                             total=55000).to_dict()
+
+
+def main():
+    kind = sys.argv[1] if len(sys.argv) > 1 else 'json'
+    ids = order_store.OrderIdAllocator(worker_id='bench')
+    print(f"{kind} store, ORDER_FSYNC={order_store.ORDER_FSYNC}, ms per checkout")
+    for size in (1000, 10000):
+        with tempfile.TemporaryDirectory() as directory:
+            store = open_store(kind, directory)
+            store.save({f'OLD{n}': order(n) for n in range(size)})
+            start = time.perf_counter()
+            for n in range(CHECKOUTS):
+                store.insert_order(ids.next_id(), order(n))
+            insert_only = (time.perf_counter() - start) / CHECKOUTS
+            start = time.perf_counter()
+            for n in range(CHECKOUTS):
+                order_id = ids.next_id()
+                store.insert_order(order_id, order(n))
+                open_store(kind, directory).get_order(order_id)
+            read_back = (time.perf_counter() - start) / CHECKOUTS
+        print(f"{size:6} orders: {insert_only * 1000:7.2f}   with read-back {read_back * 1000:7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Bot API connection pool size vs threads making calls.
+
+A local fake Bot API answers in 20 ms and charges 40 ms for every new
+connection, like a TCP + TLS handshake with api.telegram.org. Each thread
+makes 40 calls with 0-5 ms of handler work in between. Cells show calls/s
+and how many connections were opened.
+
+    python bench/connection_pool.py
+"""
+import os
+import sys
+import time
+import random
+import logging
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'tests')]
+
+from telegram import Bot
+from telegram.error import NetworkError
+from telegram.utils.request import Request
+
+import dispatch
+from fake_api import TOKEN, FakeBotAPI
+
+CALLS = 40
+logging.getLogger('dispatch').setLevel(logging.WARNING)
+
+
+def run(threads, request):
+    api = FakeBotAPI(latency=0.02, connect_delay=0.04)
+    bot = Bot(TOKEN, base_url=api.base_url, request=request)
+
+    errors = []
+
+    def handler(seed):
+        rng = random.Random(seed)
+        for _ in range(CALLS):
+            time.sleep(rng.uniform(0, 0.005))
+            try:
+                bot.send_message(seed, 'halo')
+            except NetworkError as e:
+                errors.append(e)
+
+    workers = [threading.Thread(target=handler, args=(1000 + n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    request.stop()
+    api.close()
+    cell = f"{threads * CALLS / elapsed:5.0f}/s {api.connections:5} conn"
+    return cell + (f" ({len(errors)} errors)" if errors else "")
+
+
+def main():
+    print(f"{'threads':>7}   {'pool 1':^18}   {'pool 8 (PTB default)':^18}   {'make_request':^18}")
+    for threads in (4, 16, 32, 64):
+        cells = [run(threads, Request(con_pool_size=1)), run(threads, Request(con_pool_size=8)),
+                 run(threads, dispatch.make_request(threads))]
+        print(f"{threads:7}   " + "   ".join(cells))
+
+
+if __name__ == '__main__':
+    main()
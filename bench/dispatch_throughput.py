@@ -0,0 +1,74 @@
+"""Update throughput at 1, 4 and 16 dispatch workers.
+
+100 users send 10 messages each; every handler blocks 5 ms, like a
+storage call. Runs PTB's real Dispatcher against a local fake Bot API.
+
+    python bench/dispatch_throughput.py
+"""
+import os
+import sys
+import time
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'tests')]
+
+from telegram import Update
+from telegram.ext import MessageHandler, Filters
+
+import dispatch
+from fake_api import TOKEN, FakeBotAPI, make_update
+
+USERS = 100
+MESSAGES = 10
+HANDLER_SECONDS = 0.005
+
+
+def run(api, workers):
+    updater = dispatch.make_updater(TOKEN, workers=workers)
+    updater.bot.base_url = api.base_url + TOKEN
+    seen = {}
+    active = set()
+    overlaps = []
+    done = threading.Event()
+    lock = threading.Lock()
+
+    def handle(update, context):
+        user_id = update.effective_user.id
+        with lock:
+            if user_id in active:
+                overlaps.append(user_id)
+            active.add(user_id)
+        time.sleep(HANDLER_SECONDS)
+        with lock:
+            active.discard(user_id)
+            seen.setdefault(user_id, []).append(update.update_id)
+            if sum(map(len, seen.values())) == USERS * MESSAGES:
+                done.set()
+
+    updater.dispatcher.add_handler(MessageHandler(Filters.text, handle))
+    updates = [Update.de_json(make_update(m * USERS + u, 1000 + u, text=f'pesan {m}'), updater.bot)
+               for m in range(MESSAGES) for u in range(USERS)]
+    thread = threading.Thread(target=updater.dispatcher.start, daemon=True)
+    thread.start()
+    start = time.perf_counter()
+    for update in updates:
+        updater.update_queue.put(update)
+    done.wait()
+    elapsed = time.perf_counter() - start
+    updater.dispatcher.stop()
+    dispatch.finish_updates(updater)
+    in_order = all(ids == sorted(ids) for ids in seen.values())
+    print(f"{workers:3} workers: {len(updates) / elapsed:7.0f} updates/s   "
+          f"per-user order kept: {in_order}   overlaps: {len(overlaps)}")
+
+
+def main():
+    api = FakeBotAPI()
+    for workers in (1, 4, 16):
+        run(api, workers)
+    api.close()
+
+
+if __name__ == '__main__':
+    main()
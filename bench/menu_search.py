@@ -0,0 +1,55 @@
+"""Inline menu search on a synthetic 10k-item menu.
+
+    python bench/menu_search.py [items]
+"""
+import os
+import sys
+import time
+import random
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('MENU_FILE', os.path.join(ROOT, 'menu.json'))
+
+import menu
+
+WORDS = ('nasi goreng mie ayam bakso sate soto rendang ikan bakar udang cumi tahu tempe sayur '
+         'sambal pedas manis gurih spesial jumbo es teh jeruk kopi susu coklat alpukat mangga').split()
+QUERIES = ('n', 'nasi', 'nasi g', 'ayam bakar pedas', 'es', 'kopi susu', 'zzz')
+
+
+def synthetic_menu(count):
+    rng = random.Random(1)
+    menu_items = {}
+    for n in range(count):
+        name = ' '.join(rng.sample(WORDS, 3)) + f' {n}'
+        item = {'id': f'X{n:05d}', 'name': name.title(), 'price': rng.randrange(5, 100) * 1000,
+                'desc': ' '.join(rng.sample(WORDS, 5))}
+        menu_items.setdefault(f'cat{n % 20}', []).append(item)
+    return menu_items
+
+
+def per_call(fn, number=2000):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    menu_items = synthetic_menu(count)
+    start = time.perf_counter()
+    catalog = menu.MenuCatalog(menu_items, {})
+    print(f"{count} items, {len(catalog.prefixes)} prefixes, catalog built in {time.perf_counter() - start:.2f} s")
+    print(f"{'query':18} {'hits':>5} {'search':>10} {'first':>10} {'cached':>10}")
+    for query in QUERIES:
+        hits = len(catalog.search(query))
+        search = per_call(lambda: catalog.search(query))
+        start = time.perf_counter()
+        catalog.inline_results(query)
+        first = time.perf_counter() - start
+        cached = per_call(lambda: catalog.inline_results(query))
+        print(f"{query!r:18} {hits:5} {search * 1e6:8.1f}us {first * 1e6:8.1f}us {cached * 1e6:8.2f}us")
+
+
+if __name__ == '__main__':
+    main()
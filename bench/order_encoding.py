@@ -0,0 +1,57 @@
+"""Size and parse time of an orders file: legacy vs compact order items.
+
+Legacy orders stored one full menu dict per unit, written with indent=2;
+orders now store [item_id, qty, unit_price] lines without indentation.
+
+    python bench/order_encoding.py [orders]
+"""
+import os
+import sys
+import json
+import time
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('MENU_FILE', os.path.join(ROOT, 'menu.json'))
+
+import menu
+import order_store
+
+
+def legacy_orders(count):
+    rng = random.Random(1)
+    menu_items = list(menu.catalog.items.values())
+    orders = {}
+    for n in range(count):
+        items = [dict(item) for item in rng.choices(menu_items, k=rng.randint(1, 6))]
+        orders[f'ORD20250101{n:06d}'] = {
+            'user_id': rng.randrange(10 ** 9), 'customer_name': 'Budi Santoso', 'phone': '081234567890',
+            'address': 'Jl. Mawar No. 12, Jakarta Selatan', 'items': items,
+            'total': sum(item['price'] for item in items), 'status': 'selesai',
+            'timestamp': f'2025-01-01T12:{n % 60:02d}:00',
+        }
+    return orders
+
+
+def measure(label, text, upgrade):
+    start = time.perf_counter()
+    orders = json.loads(text)
+    if upgrade:
+        order_store.upgrade_orders(orders)
+    elapsed = time.perf_counter() - start
+    print(f"{label:8} {len(text.encode()) / 1e6:6.1f} MB  parse {elapsed:.2f} s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    orders = legacy_orders(count)
+    legacy = json.dumps(orders, indent=2, ensure_ascii=False)
+    compact = order_store._dump_compact(order_store.upgrade_orders(orders))
+    print(f"{count} orders")
+    measure('legacy', legacy, upgrade=True)
+    measure('compact', compact, upgrade=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Order id allocation: throughput and uniqueness across processes.
+
+    python bench/order_ids.py [processes] [ids per process]
+"""
+import os
+import sys
+import time
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import order_store
+
+
+def allocate(count, results):
+    allocator = order_store.OrderIdAllocator()
+    results.put([allocator.next_id() for _ in range(count)])
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    workers = [context.Process(target=allocate, args=(count, results)) for _ in range(processes)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    ids = [order_id for _ in workers for order_id in results.get()]
+    elapsed = time.perf_counter() - start
+    for worker in workers:
+        worker.join()
+
+    single = order_store.OrderIdAllocator()
+    start = time.perf_counter()
+    for _ in range(count):
+        single.next_id()
+    per_id = (time.perf_counter() - start) / count
+
+    print(f"{processes} processes x {count} ids: {len(ids)} ids, {len(set(ids))} unique, "
+          f"{elapsed:.2f} s including process start")
+    print(f"one process: {per_id * 1e6:.2f} us per id ({1 / per_id:,.0f} ids/s)")
+
+
+if __name__ == '__main__':
+    main()
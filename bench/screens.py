@@ -0,0 +1,40 @@
+"""Static screens: built on every call vs served from the render cache.
+
+    python bench/screens.py
+"""
+import os
+import sys
+import timeit
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('MENU_FILE', os.path.join(ROOT, 'menu.json'))
+os.environ.setdefault('SESSION_STORAGE', 'memory')
+# Importing the bots opens their order stores in the working directory
+os.chdir(tempfile.mkdtemp())
+
+import bot
+import admin_bot
+
+VIEWS = [
+    ('start (customer)', bot.start_view, ('customer', 'id')),
+    ('start (admin)', bot.start_view, ('admin', 'id')),
+    ('admin dashboard', admin_bot.admin_start_view, ('id',)),
+]
+
+
+def per_call(fn, args, number=20000):
+    return min(timeit.repeat(lambda: fn(*args), number=number, repeat=5)) / number
+
+
+def main():
+    print(f"{'view':18} {'built':>10} {'cached':>10}")
+    for label, view, args in VIEWS:
+        built = per_call(view.__wrapped__, args)
+        cached = per_call(view, args)
+        print(f"{label:18} {built * 1e6:8.2f}us {cached * 1e6:8.2f}us")
+
+
+if __name__ == '__main__':
+    main()
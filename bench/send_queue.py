@@ -0,0 +1,86 @@
+"""Direct sends vs the rate-limited send queue (outbox.Outbox).
+
+A local fake Bot API enforces Telegram's limits (30 msg/s in total,
+1 msg/s with a burst of 3 per chat, 429 beyond that) with 30 ms per call.
+Each chat gets 4 quick edits of its menu message, a reply and an order
+confirmation, sent from 16 handler threads.
+
+    python bench/send_queue.py [chats]
+"""
+import os
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from statistics import median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'tests')]
+
+from telegram.error import TelegramError
+from telegram.utils.request import Request
+
+import outbox
+from fake_api import TOKEN, FakeBotAPI
+
+HANDLER_THREADS = 16
+
+
+def workload(bot, chat_id):
+    """Send one chat's calls; returns (kind, sent at, result, Future or exception)"""
+    calls = [('edit', lambda k=k: bot.edit_message_text(f'menu {k}', chat_id=chat_id, message_id=1))
+             for k in range(4)]
+    calls.append(('reply', lambda: bot.send_message(chat_id, 'reply')))
+    calls.append(('confirm', lambda: bot.send_message(chat_id, 'confirm', priority=outbox.URGENT)))
+    results = []
+    for kind, call in calls:
+        sent = time.perf_counter()
+        try:
+            result = call()
+        except TelegramError as e:
+            result = e
+        if isinstance(result, Future):
+            done = []
+            result.add_done_callback(lambda _, done=done: done.append(time.perf_counter()))
+            results.append((kind, sent, result, done))
+        else:
+            results.append((kind, sent, result, [time.perf_counter()]))
+    return results
+
+
+def run(label, chats, box):
+    api = FakeBotAPI(latency=0.03, global_rate=30, chat_rate=1, chat_burst=3)
+    bot = outbox.QueuedBot(TOKEN, base_url=api.base_url, outbox=box,
+                           request=Request(con_pool_size=HANDLER_THREADS + outbox.SEND_THREADS))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(HANDLER_THREADS) as pool:
+        results = [call for calls in pool.map(lambda chat_id: workload(bot, chat_id), range(1000, 1000 + chats))
+                   for call in calls]
+    confirm_latency = []
+    failed = 0
+    for kind, sent, result, done in results:
+        if isinstance(result, Future):
+            if result.exception() is not None:
+                failed += 1
+        elif isinstance(result, Exception):
+            failed += 1
+        if kind == 'confirm':
+            confirm_latency.append(done[0] - sent)
+    if box is not None:
+        box.close()
+    elapsed = time.perf_counter() - start
+    api.close()
+    final_ok = sum(1 for texts in api.messages.values()
+                   if [text for text in texts if text.startswith('menu')][-1:] == ['menu 3'])
+    print(f"{label:7} {elapsed:5.1f} s  delivered {sum(map(len, api.messages.values())):4}  "
+          f"429s {api.rejected:4}  failed {failed:4}  final menu shown {final_ok}/{chats}  "
+          f"confirmation p50 {median(confirm_latency):.2f} s")
+
+
+def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    run('direct', chats, None)
+    run('outbox', chats, outbox.Outbox())
+
+
+if __name__ == '__main__':
+    main()
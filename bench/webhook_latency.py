@@ -0,0 +1,131 @@
+"""Update delivery: long polling vs webhook, against a local fake Bot API.
+
+Latency is from the update reaching "Telegram" (the fake API, or the
+webhook POST being sent) to the handler running, one update at a time.
+A burst sends many updates at once; the webhook burst uses 8 connections,
+as Telegram would with max_connections.
+
+    python bench/webhook_latency.py [updates] [burst]
+"""
+import os
+import sys
+import json
+import time
+import threading
+import http.client
+from statistics import quantiles
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'tests')]
+
+from telegram import Update
+from telegram.ext import MessageHandler, Filters
+
+import dispatch
+import webhook
+from fake_api import TOKEN, FakeBotAPI, make_update
+
+SECRET = 'bench-secret'
+CONNECTIONS = 8
+
+
+class Bench:
+    def __init__(self, api):
+        self.updater = dispatch.make_updater(TOKEN, workers=1)
+        self.updater.bot.base_url = api.base_url + TOKEN
+        self.handled = {}
+        self.cond = threading.Condition()
+        self.updater.dispatcher.add_handler(MessageHandler(Filters.text, self.handle))
+
+    def handle(self, update, context):
+        with self.cond:
+            self.handled[update.update_id] = time.perf_counter()
+            self.cond.notify_all()
+
+    def wait(self, update_id):
+        with self.cond:
+            self.cond.wait_for(lambda: update_id in self.handled, timeout=30)
+        return self.handled[update_id]
+
+
+def report(label, latencies, burst, burst_seconds):
+    p50, p90, p99 = (quantiles(latencies, n=100)[i] for i in (49, 89, 98))
+    print(f"{label:8} p50 {p50 * 1000:5.2f} ms  p90 {p90 * 1000:5.2f} ms  p99 {p99 * 1000:5.2f} ms   "
+          f"burst of {burst}: {burst_seconds * 1000:4.0f} ms")
+
+
+def polling(count, burst):
+    api = FakeBotAPI()
+    bench = Bench(api)
+    bench.updater.start_polling(poll_interval=0, timeout=10)
+    latencies = []
+    for update_id in range(1, count + 1):
+        sent = time.perf_counter()
+        api.add_updates([make_update(update_id, 1000 + update_id % 50, text='halo')])
+        latencies.append(bench.wait(update_id) - sent)
+    start = time.perf_counter()
+    api.add_updates([make_update(count + n, 1000 + n % 50, text='halo') for n in range(1, burst + 1)])
+    bench.wait(count + burst)
+    report('polling', latencies, burst, time.perf_counter() - start)
+    bench.updater.stop()
+    api.close()
+
+
+def post(connection, data):
+    connection.request('POST', '/telegram', body=json.dumps(data),
+                       headers={'Content-Type': 'application/json', 'X-Telegram-Bot-Api-Secret-Token': SECRET})
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 200, response.status
+
+
+def webhook_mode(count, burst):
+    api = FakeBotAPI()
+    bench = Bench(api)
+
+    def deliver(updates):
+        for update in updates:
+            bench.updater.update_queue.put(update)
+
+    threading.Thread(target=bench.updater.dispatcher.start, daemon=True).start()
+    server = webhook.WebhookServer(bench.updater.bot, deliver, listen='127.0.0.1', port=0,
+                                   path='/telegram', secret=SECRET)
+    server.start()
+    connections = [http.client.HTTPConnection('127.0.0.1', server.port) for _ in range(CONNECTIONS)]
+    latencies = []
+    for update_id in range(1, count + 1):
+        sent = time.perf_counter()
+        post(connections[0], make_update(update_id, 1000 + update_id % 50, text='halo'))
+        latencies.append(bench.wait(update_id) - sent)
+
+    def send_share(connection, update_ids):
+        for update_id in update_ids:
+            post(connection, make_update(update_id, 1000 + update_id % 50, text='halo'))
+
+    update_ids = list(range(count + 1, count + burst + 1))
+    threads = [threading.Thread(target=send_share, args=(connection, update_ids[i::CONNECTIONS]))
+               for i, connection in enumerate(connections)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for update_id in update_ids:
+        bench.wait(update_id)
+    report('webhook', latencies, burst, time.perf_counter() - start)
+    for thread in threads:
+        thread.join()
+    for connection in connections:
+        connection.close()
+    server.stop()
+    bench.updater.dispatcher.stop()
+    api.close()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    burst = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    polling(count, burst)
+    webhook_mode(count, burst)
+
+
+if __name__ == '__main__':
+    main()
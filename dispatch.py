@@ -0,0 +1,144 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+from telegram.ext import Updater, Dispatcher, JobQueue
+from telegram.utils.request import Request
+
+import outbox
+
+logger = logging.getLogger(__name__)
+
+# ==================== CONFIGURATION ====================
+# DISPATCH_WORKERS=1 -> update diproses satu per satu (default, seperti dulu)
+# DISPATCH_WORKERS=8 -> update diproses paralel oleh 8 thread; update dari user
+#                       yang sama tetap diproses berurutan
+DISPATCH_WORKERS = int(os.getenv('DISPATCH_WORKERS', '1'))
+
+# Koneksi HTTP ke Bot API dipakai ulang (keep-alive). 0 = otomatis: satu koneksi
+# untuk setiap thread yang bisa memanggil Bot API bersamaan
+BOT_API_POOL_SIZE = int(os.getenv('BOT_API_POOL_SIZE', '0'))
+# Batas waktu (detik) membuka koneksi dan menunggu jawaban Bot API
+BOT_API_CONNECT_TIMEOUT = float(os.getenv('BOT_API_CONNECT_TIMEOUT', '5'))
+BOT_API_READ_TIMEOUT = float(os.getenv('BOT_API_READ_TIMEOUT', '5'))
+
+# ==================== BOT API CONNECTIONS ====================
+def make_request(threads):
+    """Keep-alive connection pool for Bot API calls made by `threads` threads at once.
+
+    urllib3 keeps up to the pool size of connections open for reuse; a call
+    made while all of them are busy opens an extra connection that is closed
+    afterwards, a new TCP and TLS handshake with api.telegram.org each time.
+    """
+    # Plus polling, job queue and main thread
+    size = BOT_API_POOL_SIZE or threads + 4
+    logger.info(f"🔌 Bot API: up to {size} keep-alive connections")
+    return Request(con_pool_size=size, connect_timeout=BOT_API_CONNECT_TIMEOUT, read_timeout=BOT_API_READ_TIMEOUT)
+
+# ==================== PER-USER DISPATCH ====================
+class PerUserExecutor:
+    """Thread pool that runs tasks one at a time per key, in submission order.
+
+    Each active key has a queue of pending tasks and at most one task in the
+    pool. A worker runs one task and then puts the key back at the end of the
+    pool queue, so a user with many queued updates cannot hold a worker while
+    other users wait.
+    """
+
+    def __init__(self, workers):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dispatch')
+        self._lock = threading.Lock()
+        # key -> deque of (fn, args); a key is present while it has work
+        self._queues = {}
+
+    def submit(self, key, fn, *args):
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is not None:
+                queue.append((fn, args))
+                return
+            self._queues[key] = deque([(fn, args)])
+        self._pool.submit(self._run_next, key)
+
+    def _run_next(self, key):
+        with self._lock:
+            fn, args = self._queues[key].popleft()
+        try:
+            fn(*args)
+        except Exception:
+            logger.exception(f"Dispatch task for {key} failed")
+        with self._lock:
+            if not self._queues[key]:
+                del self._queues[key]
+                return
+        self._pool.submit(self._run_next, key)
+
+    def pending(self):
+        """Number of queued tasks not yet started"""
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def shutdown(self):
+        """Finish every queued task, then stop the workers"""
+        while True:
+            with self._lock:
+                if not self._queues:
+                    break
+            time.sleep(0.05)
+        self._pool.shutdown(wait=True)
+
+
+def update_key(update):
+    """Serialization key of an update: the user, else the chat"""
+    user = getattr(update, 'effective_user', None)
+    if user is not None:
+        return ('user', user.id)
+    chat = getattr(update, 'effective_chat', None)
+    if chat is not None:
+        return ('chat', chat.id)
+    return None
+
+
+class PerUserDispatcher(Dispatcher):
+    """Dispatcher that handles updates on a PerUserExecutor.
+
+    The dispatcher thread keeps reading the update queue; each update is
+    queued under its user instead of being handled inline, so a slow handler
+    only delays later updates of the same user.
+    """
+
+    def __init__(self, *args, dispatch_workers, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = PerUserExecutor(dispatch_workers)
+
+    def process_update(self, update):
+        self.executor.submit(update_key(update), super().process_update, update)
+
+
+def make_updater(token, workers=DISPATCH_WORKERS, send_queue=None):
+    """Updater whose updates are handled by `workers` threads, serialized per user.
+
+    With workers 1 this is the plain Updater (updates handled one by one).
+    Messages and edits go through `send_queue` (an outbox.Outbox) if given.
+    """
+    # A connection per worker (PTB's default 4 run_async workers for the plain
+    # Updater) and send queue thread, plus the dispatcher thread
+    senders = outbox.SEND_THREADS if send_queue is not None else 0
+    bot = outbox.QueuedBot(token, request=make_request(max(workers, 4) + senders + 1), outbox=send_queue)
+    if workers <= 1:
+        return Updater(bot=bot, use_context=True)
+    job_queue = JobQueue()
+    # PTB's own run_async pool is not used; one thread avoids its no-workers warning
+    dispatcher = PerUserDispatcher(bot, Queue(), job_queue=job_queue, workers=1, dispatch_workers=workers)
+    job_queue.set_dispatcher(dispatcher)
+    logger.info(f"⚙️ Dispatch: {workers} workers, serialized per user")
+    return Updater(dispatcher=dispatcher, workers=None)
+
+
+def finish_updates(updater):
+    """After updater.idle(): wait for updates still queued on the workers"""
+    if isinstance(updater.dispatcher, PerUserDispatcher):
+        updater.dispatcher.executor.shutdown()
@@ -1,9 +1,17 @@
 import os
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Updater, CommandHandler, CallbackContext, CallbackQueryHandler, MessageHandler, Filters
-import json
+from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler, MessageHandler, Filters, InlineQueryHandler
 from datetime import datetime
+import order_store
+import sessions
+import dispatch
+import webhook
+import outbox
+import notify
+import menu
+from menu import item_name
+from render_cache import cached_view, clear_views, user_locale, user_role
 
 # Setup logging
 logging.basicConfig(
@@ -19,55 +27,53 @@ ADMIN_IDS = [7521156999] # ⚠️ GANTI INI DENGAN ID ANDA!
 
 ORDERS_FILE = 'orders.json'
 
+# Seberapa sering (detik) file menu dicek untuk perubahan
+MENU_RELOAD_SECONDS = int(os.getenv('MENU_RELOAD_SECONDS', '10'))
+
+# Berapa lama (detik) Telegram boleh menyimpan hasil pencarian inline (@bot nasi)
+INLINE_CACHE_SECONDS = int(os.getenv('INLINE_CACHE_SECONDS', '60'))
+
 # ==================== DATA STORAGE ====================
+# ORDER_STORAGE selects the backend: json (default), journal or sqlite
+orders_store = order_store.open_store(ORDERS_FILE)
+order_ids = order_store.OrderIdAllocator()
+# Old completed orders, read only when a handler asks for them
+order_archive = order_store.OrderArchive()
+
 def load_orders():
-    """Load orders from JSON file"""
-    try:
-        with open(ORDERS_FILE, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+    """Load orders from the order store"""
+    return orders_store.load()
 
 def save_orders(orders):
-    """Save orders to JSON file"""
-    with open(ORDERS_FILE, 'w') as f:
-        json.dump(orders, f, indent=2)
+    """Replace all orders in the order store"""
+    orders_store.save(orders)
+
+def find_order(order_id):
+    """Find an order in the order store, then in the archive"""
+    order = orders_store.get_order(order_id)
+    if order is None:
+        order = order_archive.get_order(order_id)
+    return order
 
 def is_admin(user_id):
     """Check if user is admin"""
     return user_id in ADMIN_IDS
 
-# ==================== MENU DATA ====================
-MENU_ITEMS = {
-    'makanan': [
-        {'id': 'M001', 'name': 'Nasi Goreng Spesial', 'price': 25000, 'desc': 'Nasi goreng dengan ayam dan seafood'},
-        {'id': 'M002', 'name': 'Mie Ayam Bakso', 'price': 20000, 'desc': 'Mie ayam dengan bakso urat'},
-        {'id': 'M003', 'name': 'Ayam Geprek', 'price': 18000, 'desc': 'Ayam crispy dengan sambal bawang'},
-    ],
-    'minuman': [
-        {'id': 'D001', 'name': 'Es Teh Manis', 'price': 8000, 'desc': 'Es teh dengan gula merah'},
-        {'id': 'D002', 'name': 'Jus Alpukat', 'price': 15000, 'desc': 'Jus alpukat dengan susu dan es krim'},
-        {'id': 'D003', 'name': 'Kopi Latte', 'price': 12000, 'desc': 'Kopi espresso dengan susu steamed'},
-    ],
-    'dessert': [
-        {'id': 'S001', 'name': 'Es Krim Vanilla', 'price': 12000, 'desc': 'Es krim homemade vanilla'},
-        {'id': 'S002', 'name': 'Pudding Coklat', 'price': 10000, 'desc': 'Pudding coklat dengan vla vanilla'},
-    ]
-}
-
-# In-memory sessions
-user_sessions = {}
-
-# ==================== CUSTOMER FUNCTIONS ====================
-def start(update: Update, context: CallbackContext):
-    user = update.effective_user
-    user_id = user.id
-    
-    # Reset user session
-    user_sessions[user_id] = {'cart': [], 'step': None}
-    
-    # Check if user is admin
-    if is_admin(user_id):
+# NOTIFY_CUSTOMERS=on: customers get a message when an admin changes their order status
+status_notifier = notify.open_notifier(find_order)
+
+# Sessions, evicted when idle (SESSION_TTL_SECONDS) or over MAX_SESSIONS;
+# SESSION_STORAGE=sqlite (default) keeps them across restarts
+user_sessions = sessions.open_sessions()
+
+# ==================== STATIC VIEWS ====================
+# Built once per (role, locale) and served from render_cache; clear_views()
+# drops them when the menu or config changes. Menu screens come prebuilt from
+# menu.catalog instead.
+@cached_view
+def start_view(role, locale):
+    """Welcome screen as (text before name, text after name, reply_markup)"""
+    if role == 'admin':
         keyboard = [
             [InlineKeyboardButton("🛒 Pesan Makanan", callback_data="view_categories")],
             [InlineKeyboardButton("👑 Admin Panel", callback_data="admin_start")],
@@ -82,17 +88,18 @@ def start(update: Update, context: CallbackContext):
     
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    welcome_text = f"""
+    head = """
 🍽️ **Selamat Datang di Restoran Kami!** 🍽️
 
-Halo {user.first_name}! 
+Halo """
+    tail = """! 
 Siap memesan makanan lezat hari ini?
     """
     
-    if is_admin(user_id):
-        welcome_text += "\n👑 *Anda login sebagai Admin*"
+    if role == 'admin':
+        tail += "\n👑 *Anda login sebagai Admin*"
     
-    welcome_text += """
+    tail += """
 
 **Perintah tersedia:**
 /menu - Lihat menu lengkap
@@ -100,51 +107,103 @@ Siap memesan makanan lezat hari ini?
 /help - Bantuan pemesanan
 /status - Cek status pesanan
     """
-    
-    update.message.reply_text(welcome_text, reply_markup=reply_markup, parse_mode='Markdown')
+    return head, tail, reply_markup
 
-def show_menu(update: Update, context: CallbackContext):
-    menu_text = """
-🍽️ **MENU RESTORAN KAMI** 🍽️
-
-**🍛 MAKANAN:**
-• Nasi Goreng Spesial - Rp 25,000
-• Mie Ayam Bakso - Rp 20,000  
-• Ayam Geprek - Rp 18,000
-
-**🥤 MINUMAN:**
-• Es Teh Manis - Rp 8,000
-• Jus Alpukat - Rp 15,000
-• Kopi Latte - Rp 12,000
-
-**🍰 DESSERT:**
-• Es Krim Vanilla - Rp 12,000
-• Pudding Coklat - Rp 10,000
+@cached_view
+def help_view(locale):
+    """Help screen text"""
+    return """
+🆘 **BANTUAN PEMESANAN**
+
+**Cara Pesan:**
+1. Klik 'Pesan Sekarang' atau ketik /order
+2. Pilih kategori menu
+3. Tambah item ke keranjang
+4. Checkout dan isi data
+5. Bayar & tunggu konfirmasi
+
+**Metode Bayar:**
+• Transfer Bank (BCA, BRI, Mandiri)
+• Tunai (COD - Cash On Delivery)
+
+**Info Layanan:**
+• Area pengiriman: Jakarta & Sekitarnya
+• Min. pesanan: Rp 25,000
+• Estimasi: 30-45 menit
+
+**Problem?** Hubungi: +62 812-3456-7890
     """
-    
+
+@cached_view
+def contact_view(locale):
+    """Contact screen text"""
+    return """
+📞 **HUBUNGI KAMI**
+
+📍 **Alamat:**
+Jl. Restoran No. 123, Jakarta
+
+📱 **Kontak:**
+WhatsApp: +62 812-3456-7890
+Telepon: (021) 123-4567
+
+🕒 **Jam Operasional:**
+Senin - Minggu: 09:00 - 22:00 WIB
+
+🚗 **Layanan:**
+• Dine-in • Take away • Delivery
+
+*Free delivery untuk order > Rp 50,000*
+    """
+
+@cached_view
+def admin_start_view(locale):
+    """Admin dashboard screen as (text, reply_markup)"""
     keyboard = [
-        [InlineKeyboardButton("🛒 Pesan Sekarang", callback_data="start_order")],
-        [InlineKeyboardButton("📞 Tanya Menu", callback_data="ask_menu")],
-        [InlineKeyboardButton("🔙 Menu Utama", callback_data="back_to_main")]
+        [InlineKeyboardButton("📊 DAFTAR PESANAN", callback_data="admin_list_orders")],
+        [InlineKeyboardButton("⏳ PESANAN BARU", callback_data="admin_new_orders")],
+        [InlineKeyboardButton("👨‍🍳 PESANAN DIPROSES", callback_data="admin_processing_orders")],
+        [InlineKeyboardButton("📈 STATISTIK", callback_data="admin_stats")],
+        [InlineKeyboardButton("🛒 Mode Customer", callback_data="back_to_main")]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
+    text = """
+👑 **DASHBOARD ADMIN RESTORAN**
+
+Selamat datang di Admin Panel!
+
+**Fitur yang tersedia:**
+• 📊 Lihat semua pesanan
+• ⏳ Kelola pesanan baru  
+• 👨‍🍳 Update status pesanan
+• 📈 Lihat statistik penjualan
+    """
+    return text, reply_markup
+
+# ==================== CUSTOMER FUNCTIONS ====================
+def start(update: Update, context: CallbackContext):
+    user = update.effective_user
+    user_id = user.id
+    
+    # Reset user session
+    user_sessions.reset(user_id)
+    
+    head, tail, reply_markup = start_view(user_role(is_admin(user_id)), user_locale(user))
+    welcome_text = head + user.first_name + tail
+    
+    update.message.reply_text(welcome_text, reply_markup=reply_markup, parse_mode='Markdown')
+
+def show_menu(update: Update, context: CallbackContext):
+    menu_text, reply_markup = menu.catalog.menu_view
+    
     if update.callback_query:
         update.callback_query.edit_message_text(menu_text, reply_markup=reply_markup, parse_mode='Markdown')
     else:
         update.message.reply_text(menu_text, reply_markup=reply_markup, parse_mode='Markdown')
 
 def show_categories(update: Update, context: CallbackContext):
-    keyboard = [
-        [InlineKeyboardButton("🍛 MAKANAN", callback_data="category_makanan")],
-        [InlineKeyboardButton("🥤 MINUMAN", callback_data="category_minuman")],
-        [InlineKeyboardButton("🍰 DESSERT", callback_data="category_dessert")],
-        [InlineKeyboardButton("🛒 Lihat Keranjang", callback_data="view_cart")],
-        [InlineKeyboardButton("🔙 Menu Utama", callback_data="back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    text = "📋 **PILIH KATEGORI MENU**\n\nSilakan pilih kategori menu:"
+    text, reply_markup = menu.catalog.categories_view
     
     if update.callback_query:
         update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
@@ -153,42 +212,16 @@ def show_categories(update: Update, context: CallbackContext):
 
 def show_category_items(update: Update, context: CallbackContext):
     query = update.callback_query
-    category = query.data.replace('category_', '')
+    # category_<category> or category_<category>:<page>
+    category, _, page = query.data[len('category_'):].partition(':')
     
-    if category not in MENU_ITEMS:
+    view = menu.catalog.category_view(category, int(page) if page.isdigit() else 0)
+    
+    if view is None:
         query.edit_message_text("Kategori tidak ditemukan")
         return
     
-    items = MENU_ITEMS[category]
-    category_name = {
-        'makanan': '🍛 MAKANAN',
-        'minuman': '🥤 MINUMAN', 
-        'dessert': '🍰 DESSERT'
-    }[category]
-    
-    text = f"{category_name}\n\n"
-    
-    keyboard = []
-    for item in items:
-        keyboard.append([
-            InlineKeyboardButton(
-                f"➕ {item['name']} - Rp {item['price']:,}",
-                callback_data=f"add_{item['id']}"
-            )
-        ])
-    
-    keyboard.extend([
-        [InlineKeyboardButton("🛒 Lihat Keranjang", callback_data="view_cart")],
-        [InlineKeyboardButton("📋 Kategori Lain", callback_data="view_categories")],
-        [InlineKeyboardButton("🔙 Menu Utama", callback_data="back_to_main")]
-    ])
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    for item in items:
-        text += f"• {item['name']} - Rp {item['price']:,}\n"
-        text += f"  _{item['desc']}_\n\n"
-    
+    text, reply_markup = view
     query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
 
 def add_to_cart(update: Update, context: CallbackContext):
@@ -197,52 +230,57 @@ def add_to_cart(update: Update, context: CallbackContext):
     item_id = query.data.replace('add_', '')
     
     # Find item in menu
-    item = None
-    for category in MENU_ITEMS.values():
-        for menu_item in category:
-            if menu_item['id'] == item_id:
-                item = menu_item
-                break
-        if item:
-            break
+    item = menu.catalog.get(item_id)
     
     if not item:
         query.answer("Item tidak ditemukan", show_alert=True)
         return
     
-    # Initialize user session if not exists
-    if user_id not in user_sessions:
-        user_sessions[user_id] = {'cart': [], 'step': None}
-    
-    # Add to cart
-    user_sessions[user_id]['cart'].append(item)
+    # Add to cart (new session if none yet)
+    user_sessions.get_or_create(user_id).cart.add(item['id'], item['price'])
     
     query.answer(f"✅ {item['name']} ditambahkan ke keranjang!")
     
     # Show categories again
     show_categories(update, context)
 
+def inline_menu_search(update: Update, context: CallbackContext):
+    """Inline mode: '@bot nasi' lists matching menu items with an add button.
+
+    Inline mode has to be switched on for the bot with /setinline in @BotFather.
+    """
+    query = update.inline_query
+    results = menu.catalog.inline_results(query.query.strip())
+    query.answer(results, cache_time=INLINE_CACHE_SECONDS)
+
 def view_cart(update: Update, context: CallbackContext):
     query = update.callback_query
     user_id = query.from_user.id
+    session = user_sessions.get(user_id)
     
-    if user_id not in user_sessions or not user_sessions[user_id]['cart']:
+    if session is None or not session.cart:
         text = "🛒 **KERANJANG ANDA**\n\nKeranjang Anda masih kosong."
         keyboard = [
             [InlineKeyboardButton("📋 Lihat Menu", callback_data="view_categories")],
             [InlineKeyboardButton("🔙 Menu Utama", callback_data="back_to_main")]
         ]
     else:
-        cart = user_sessions[user_id]['cart']
-        total = sum(item['price'] for item in cart)
+        cart = session.cart
         
         text = "🛒 **KERANJANG ANDA**\n\n"
-        for i, item in enumerate(cart, 1):
-            text += f"{i}. {item['name']} - Rp {item['price']:,}\n"
+        keyboard = []
+        for i, (item_id, qty, unit_price) in enumerate(cart.items(), 1):
+            name = item_name(item_id)
+            text += f"{i}. {name} x{qty} - Rp {unit_price * qty:,}\n"
+            keyboard.append([
+                InlineKeyboardButton("➖", callback_data=f"cart_dec_{item_id}"),
+                InlineKeyboardButton(f"{name} x{qty}", callback_data="view_cart"),
+                InlineKeyboardButton("➕", callback_data=f"cart_inc_{item_id}")
+            ])
         
-        text += f"\n**Total: Rp {total:,}**"
+        text += f"\n**Total: Rp {cart.total:,}**"
         
-        keyboard = [
+        keyboard += [
             [InlineKeyboardButton("➕ Tambah Item", callback_data="view_categories")],
             [InlineKeyboardButton("✅ Checkout", callback_data="checkout")],
             [InlineKeyboardButton("🗑️ Kosongkan Keranjang", callback_data="clear_cart")],
@@ -252,15 +290,32 @@ def view_cart(update: Update, context: CallbackContext):
     reply_markup = InlineKeyboardMarkup(keyboard)
     query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
 
+def change_cart_quantity(update: Update, context: CallbackContext):
+    """➕/➖ on a cart line (cart_inc_<item_id> / cart_dec_<item_id>)"""
+    query = update.callback_query
+    session = user_sessions.get(query.from_user.id)
+    action, item_id = query.data[len('cart_'):].split('_', 1)
+    
+    if session is not None:
+        if action == 'dec':
+            session.cart.remove(item_id)
+        else:
+            line = session.cart.lines.get(item_id)
+            if line is not None:
+                session.cart.add(item_id, line[1])
+    
+    view_cart(update, context)
+
 def checkout(update: Update, context: CallbackContext):
     query = update.callback_query
     user_id = query.from_user.id
+    session = user_sessions.get(user_id)
     
-    if user_id not in user_sessions or not user_sessions[user_id]['cart']:
+    if session is None or not session.cart:
         query.answer("Keranjang masih kosong!", show_alert=True)
         return
     
-    user_sessions[user_id]['step'] = 'waiting_name'
+    session.step = 'waiting_name'
     
     text = """
 💰 **CHECKOUT** 🛒
@@ -276,79 +331,81 @@ def handle_message(update: Update, context: CallbackContext):
     user_id = update.effective_user.id
     text = update.message.text
     
-    if user_id not in user_sessions or not user_sessions[user_id].get('step'):
+    session = user_sessions.get(user_id)
+    
+    if session is None or not session.step:
         update.message.reply_text("Silakan ketik /start untuk memulai")
         return
     
-    session = user_sessions[user_id]
-    
-    if session['step'] == 'waiting_name':
-        session['customer_name'] = text
-        session['step'] = 'waiting_phone'
+    if session.step == 'waiting_name':
+        session.customer_name = text
+        session.step = 'waiting_phone'
         update.message.reply_text("📱 **Ketik nomor WhatsApp Anda:**")
         
-    elif session['step'] == 'waiting_phone':
-        session['phone'] = text
-        session['step'] = 'waiting_address'
+    elif session.step == 'waiting_phone':
+        session.phone = text
+        session.step = 'waiting_address'
         update.message.reply_text("🏠 **Ketik alamat pengiriman:**")
         
-    elif session['step'] == 'waiting_address':
-        session['address'] = text
-        session['step'] = None
+    elif session.step == 'waiting_address':
+        session.address = text
+        session.step = None
         
         # Create order
-        order_id = create_order(user_id, session)
+        order = create_order(user_id, session)
         
         # Send confirmation
-        send_order_confirmation(update, context, order_id, session)
+        send_order_confirmation(update, context, order)
         
         # Clear cart
-        session['cart'] = []
+        session.cart.clear()
 
 def create_order(user_id, session):
-    order_id = f"ORD{datetime.now().strftime('%Y%m%d%H%M%S')}"
-    
-    orders = load_orders()
-    
-    orders[order_id] = {
-        'user_id': user_id,
-        'customer_name': session['customer_name'],
-        'phone': session['phone'],
-        'address': session['address'],
-        'items': session['cart'].copy(),
-        'total': sum(item['price'] for item in session['cart']),
-        'status': 'baru',
-        'timestamp': datetime.now().isoformat()
-    }
+    """Create and store the order for a finished checkout"""
+    order = order_store.Order(
+        order_id=order_ids.next_id(),
+        user_id=user_id,
+        customer_name=session.customer_name,
+        phone=session.phone,
+        address=session.address,
+        items=session.cart.items(),
+        total=session.cart.total
+    )
+    
+    # Committed before the confirmation is sent, even with a commit window.
+    # Insert only: an id collision must never replace another customer's order
+    try:
+        orders_store.insert_order(order.order_id, order.to_dict())
+    except order_store.DuplicateOrderError:
+        logger.error(f"❌ Order id {order.order_id} already taken (WORKER_ID {order_ids.worker_id}); "
+                     f"check that every bot process has its own WORKER_ID")
+        order.order_id = order_ids.next_id()
+        orders_store.insert_order(order.order_id, order.to_dict())
     
-    save_orders(orders)
-    return order_id
+    return order
 
-def send_order_confirmation(update: Update, context: CallbackContext, order_id: str, session: dict):
-    orders = load_orders()
-    order = orders[order_id]
-    
+def send_order_confirmation(update: Update, context: CallbackContext, order: order_store.Order):
     text = f"""
 ✅ **PESANAN BERHASIL DIBUAT!**
 
-📋 **No. Pesanan:** `{order_id}`
-👤 **Nama:** {order['customer_name']}
-📱 **Telepon:** {order['phone']}
-🏠 **Alamat:** {order['address']}
+📋 **No. Pesanan:** `{order.order_id}`
+👤 **Nama:** {order.customer_name}
+📱 **Telepon:** {order.phone}
+🏠 **Alamat:** {order.address}
 
 🛒 **Detail Pesanan:**
 """
     
-    for item in order['items']:
-        text += f"• {item['name']} - Rp {item['price']:,}\n"
+    for item_id, qty, price in order.items:
+        text += f"• {item_name(item_id)} x{qty} - Rp {price * qty:,}\n"
     
-    text += f"\n💰 **Total: Rp {order['total']:,}**"
-    text += f"\n\n📊 **Status:** {order['status'].title()}"
+    text += f"\n💰 **Total: Rp {order.total:,}**"
+    text += f"\n\n📊 **Status:** {order.status.title()}"
     text += f"\n⏰ **Estimasi:** 30-45 menit"
     text += f"\n\n💳 **Metode Pembayaran:**"
     text += f"\n- Transfer Bank (BCA: 123-456-7890)"
     text += f"\n- Tunai (COD)"
-    text += f"\n\nGunakan /status untuk cek status pesanan"
+    text += f"\n\n🔔 Kami kabari Anda setiap status pesanan berubah (atau cek dengan /status)"
 
     keyboard = [
         [InlineKeyboardButton("📊 Status Pesanan", callback_data="order_status")],
@@ -357,23 +414,22 @@ def send_order_confirmation(update: Update, context: CallbackContext, order_id:
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    # Ahead of menu and cart refreshes waiting for the send rate limit
+    context.bot.send_message(update.effective_chat.id, text, reply_markup=reply_markup, parse_mode='Markdown',
+                             priority=outbox.URGENT)
 
 def order_status(update: Update, context: CallbackContext):
     user_id = update.effective_user.id
-    orders = load_orders()
     
-    # Find user's orders
-    user_orders = []
-    for order_id, order in orders.items():
-        if order['user_id'] == user_id:
-            user_orders.append((order_id, order))
+    # Get latest order, older completed ones may be in the archive
+    latest = orders_store.latest_user_order(user_id)
+    if latest is None:
+        latest = order_archive.latest_user_order(user_id)
     
-    if not user_orders:
+    if latest is None:
         text = "📊 **STATUS PESANAN**\n\nBelum ada pesanan yang ditemukan."
     else:
-        # Get latest order
-        latest_order_id, latest_order = user_orders[-1]
+        latest_order_id, latest_order = latest
         
         status_emoji = {
             'baru': '🆕',
@@ -386,7 +442,7 @@ def order_status(update: Update, context: CallbackContext):
 📊 **STATUS PESANAN TERAKHIR**
 
 📋 **No. Pesanan:** `{latest_order_id}`
-📦 **Items:** {len(latest_order['items'])} item
+📦 **Items:** {sum(qty for _, qty, _ in latest_order['items'])} item
 💰 **Total:** Rp {latest_order['total']:,}
 📊 **Status:** {latest_order['status'].title()} {status_emoji}
 ⏰ **Order Time:** {latest_order['timestamp'][:16]}
@@ -407,56 +463,20 @@ def clear_cart(update: Update, context: CallbackContext):
     query = update.callback_query
     user_id = query.from_user.id
     
-    if user_id in user_sessions:
-        user_sessions[user_id]['cart'] = []
+    session = user_sessions.get(user_id)
+    if session is not None:
+        session.cart.clear()
     
     query.answer("✅ Keranjang dikosongkan!")
     view_cart(update, context)
 
 def help_command(update: Update, context: CallbackContext):
-    help_text = """
-🆘 **BANTUAN PEMESANAN**
-
-**Cara Pesan:**
-1. Klik 'Pesan Sekarang' atau ketik /order
-2. Pilih kategori menu
-3. Tambah item ke keranjang
-4. Checkout dan isi data
-5. Bayar & tunggu konfirmasi
-
-**Metode Bayar:**
-• Transfer Bank (BCA, BRI, Mandiri)
-• Tunai (COD - Cash On Delivery)
-
-**Info Layanan:**
-• Area pengiriman: Jakarta & Sekitarnya
-• Min. pesanan: Rp 25,000
-• Estimasi: 30-45 menit
-
-**Problem?** Hubungi: +62 812-3456-7890
-    """
+    help_text = help_view(user_locale(update.effective_user))
     
     update.message.reply_text(help_text, parse_mode='Markdown')
 
 def contact(update: Update, context: CallbackContext):
-    contact_text = """
-📞 **HUBUNGI KAMI**
-
-📍 **Alamat:**
-Jl. Restoran No. 123, Jakarta
-
-📱 **Kontak:**
-WhatsApp: +62 812-3456-7890
-Telepon: (021) 123-4567
-
-🕒 **Jam Operasional:**
-Senin - Minggu: 09:00 - 22:00 WIB
-
-🚗 **Layanan:**
-• Dine-in • Take away • Delivery
-
-*Free delivery untuk order > Rp 50,000*
-    """
+    contact_text = contact_view(user_locale(update.effective_user))
     
     if update.callback_query:
         update.callback_query.edit_message_text(contact_text, parse_mode='Markdown')
@@ -472,26 +492,7 @@ def admin_start(update: Update, context: CallbackContext):
         update.message.reply_text("❌ Akses ditolak. Hanya admin yang bisa mengakses.")
         return
     
-    keyboard = [
-        [InlineKeyboardButton("📊 DAFTAR PESANAN", callback_data="admin_list_orders")],
-        [InlineKeyboardButton("⏳ PESANAN BARU", callback_data="admin_new_orders")],
-        [InlineKeyboardButton("👨‍🍳 PESANAN DIPROSES", callback_data="admin_processing_orders")],
-        [InlineKeyboardButton("📈 STATISTIK", callback_data="admin_stats")],
-        [InlineKeyboardButton("🛒 Mode Customer", callback_data="back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    text = """
-👑 **DASHBOARD ADMIN RESTORAN**
-
-Selamat datang di Admin Panel!
-
-**Fitur yang tersedia:**
-• 📊 Lihat semua pesanan
-• ⏳ Kelola pesanan baru  
-• 👨‍🍳 Update status pesanan
-• 📈 Lihat statistik penjualan
-    """
+    text, reply_markup = admin_start_view(user_locale(update.effective_user))
     
     if update.callback_query:
         update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
@@ -507,9 +508,11 @@ def admin_list_orders(update: Update, context: CallbackContext):
         query.answer("Akses ditolak")
         return
     
-    orders = load_orders()
+    status_counts = orders_store.count_by_status()
+    # Completed orders moved to the archive still count towards the total
+    archived_orders = order_archive.totals(datetime.now().date().isoformat())['total_orders']
     
-    if not orders:
+    if not status_counts and not archived_orders:
         query.edit_message_text("📭 Tidak ada pesanan")
         return
     
@@ -523,9 +526,9 @@ def admin_list_orders(update: Update, context: CallbackContext):
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    total_orders = len(orders)
-    new_orders = sum(1 for o in orders.values() if o['status'] == 'baru')
-    processing_orders = sum(1 for o in orders.values() if o['status'] == 'diproses')
+    total_orders = sum(status_counts.values()) + archived_orders
+    new_orders = status_counts.get('baru', 0)
+    processing_orders = status_counts.get('diproses', 0)
     
     text = f"""
 📊 **DAFTAR PESANAN**
@@ -549,12 +552,10 @@ def admin_show_orders(update: Update, context: CallbackContext, status_filter=No
         query.answer("Akses ditolak")
         return
     
-    orders = load_orders()
-    
     if status_filter and status_filter != 'all':
-        filtered_orders = {k: v for k, v in orders.items() if v['status'] == status_filter}
+        filtered_orders = orders_store.orders_by_status(status_filter)
     else:
-        filtered_orders = orders
+        filtered_orders = load_orders()
     
     if not filtered_orders:
         status_text = {
@@ -599,7 +600,8 @@ def admin_show_orders(update: Update, context: CallbackContext, status_filter=No
 
 def format_order_detail(order_id, order):
     """Format order details for display"""
-    items_text = "\n".join([f"• {item['name']} - Rp {item['price']:,}" for item in order['items']])
+    items_text = "\n".join([f"• {item_name(item_id)} x{qty} - Rp {price * qty:,}"
+                            for item_id, qty, price in order['items']])
     
     status_emoji = {
         'baru': '🆕',
@@ -644,16 +646,15 @@ def admin_update_status(update: Update, context: CallbackContext):
         'completed': 'selesai'
     }
     
-    orders = load_orders()
+    old_status = orders_store.update_status(order_id, status_map[new_status])
     
-    if order_id not in orders:
+    if old_status is None:
         query.answer("Pesanan tidak ditemukan")
         return
     
-    old_status = orders[order_id]['status']
-    orders[order_id]['status'] = status_map[new_status]
-    
-    save_orders(orders)
+    # The customer is told from the notifier thread; this tap does not wait for it
+    if status_notifier is not None:
+        status_notifier.status_changed(order_id, old_status, status_map[new_status])
     
     query.answer(f"✅ Status diupdate ke {status_map[new_status].title()}")
     
@@ -669,25 +670,37 @@ def admin_stats(update: Update, context: CallbackContext):
         query.answer("Akses ditolak")
         return
     
-    orders = load_orders()
-    
-    if not orders:
-        query.edit_message_text("📊 Belum ada data statistik")
+    # Today's orders
+    today = datetime.now().date().isoformat()
+    stats = orders_store.stats(today)
+    
+    # Archived orders (all completed) count too; their totals come from the
+    # archive index, the partitions themselves are not read
+    archived = order_archive.totals(today)
+    stats['total_orders'] += archived['total_orders']
+    stats['total_revenue'] += archived['total_revenue']
+    stats['day_orders'] += archived['day_orders']
+    stats['day_revenue'] += archived['day_revenue']
+    stats['status_counts']['selesai'] = stats['status_counts'].get('selesai', 0) + archived['total_orders']
+    
+    if not stats['total_orders']:
+        query.edit_message_text("📊 Belum ada data statistik", reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("🔙 Dashboard", callback_data="admin_back_dashboard")]
+        ]))
         return
     
-    # Calculate stats
-    total_orders = len(orders)
-    total_revenue = sum(order['total'] for order in orders.values())
-    
-    status_counts = {}
-    for order in orders.values():
-        status = order['status']
-        status_counts[status] = status_counts.get(status, 0) + 1
+    total_orders = stats['total_orders']
+    total_revenue = stats['total_revenue']
+    status_counts = stats['status_counts']
+    today_orders = stats['day_orders']
+    today_revenue = stats['day_revenue']
     
-    # Today's orders
-    today = datetime.now().date().isoformat()
-    today_orders = sum(1 for order in orders.values() if order['timestamp'].startswith(today))
-    today_revenue = sum(order['total'] for order in orders.values() if order['timestamp'].startswith(today))
+    day_hours = stats['day_hours']
+    if day_hours:
+        peak_hour = max(day_hours, key=lambda hour: day_hours[hour][0])
+        peak_text = f"{peak_hour}:00 ({day_hours[peak_hour][0]} pesanan)"
+    else:
+        peak_text = "-"
     
     text = f"""
 📈 **STATISTIK RESTORAN**
@@ -695,6 +708,7 @@ def admin_stats(update: Update, context: CallbackContext):
 📅 **Hari Ini:**
 • Pesanan: {today_orders}
 • Pendapatan: Rp {today_revenue:,}
+• Jam Tersibuk: {peak_text}
 
 📊 **Total:**
 • Total Pesanan: {total_orders}
@@ -725,14 +739,12 @@ def admin_contact_customer(update: Update, context: CallbackContext):
         return
     
     order_id = query.data.split('_')[-1]
-    orders = load_orders()
+    order = find_order(order_id)
     
-    if order_id not in orders:
+    if order is None:
         query.answer("Pesanan tidak ditemukan")
         return
     
-    order = orders[order_id]
-    
     text = f"""
 📞 **KONTAK CUSTOMER**
 
@@ -768,12 +780,14 @@ def button_handler(update: Update, context: CallbackContext):
         show_menu(update, context)
     elif data == "start_order" or data == "view_categories":
         show_categories(update, context)
-    elif data in ["category_makanan", "category_minuman", "category_dessert"]:
+    elif data.startswith("category_"):
         show_category_items(update, context)
     elif data.startswith("add_"):
         add_to_cart(update, context)
     elif data == "view_cart":
         view_cart(update, context)
+    elif data.startswith("cart_inc_") or data.startswith("cart_dec_"):
+        change_cart_quantity(update, context)
     elif data == "checkout":
         checkout(update, context)
     elif data == "clear_cart":
@@ -796,7 +810,8 @@ def button_handler(update: Update, context: CallbackContext):
         admin_show_orders(update, context, 'baru')
     elif data == "admin_processing_orders":
         admin_show_orders(update, context, 'diproses')
-    elif data == "admin_stats":
+    elif data in ("admin_stats", "admin_stats_archive"):
+        # admin_stats_archive: the former "Termasuk Arsip" button on older messages
         admin_stats(update, context)
     elif data.startswith("admin_filter_"):
         filter_type = data.replace('admin_filter_', '')
@@ -810,9 +825,23 @@ def button_handler(update: Update, context: CallbackContext):
         admin_contact_customer(update, context)
     elif data.startswith("admin_back_to_order_"):
         order_id = data.replace('admin_back_to_order_', '')
-        orders = load_orders()
-        if order_id in orders:
-            admin_show_orders(update, context, orders[order_id]['status'])
+        order = find_order(order_id)
+        if order is not None:
+            admin_show_orders(update, context, order['status'])
+
+def reload_menu(context: CallbackContext):
+    """Periodic job: pick up edits to the menu file without a restart"""
+    if menu.reload_menu():
+        clear_views()
+
+def expire_sessions(context: CallbackContext):
+    """Periodic job: drop idle sessions and log session metrics"""
+    user_sessions.expire()
+    logger.info(f"👥 Sessions: {user_sessions.metrics()}")
+
+def archive_orders(context: CallbackContext):
+    """Periodic job: move old completed orders out of the order store"""
+    order_store.archive_completed(orders_store, order_archive)
 
 def main():
     """Main function"""
@@ -827,7 +856,10 @@ def main():
     global ADMIN_IDS
     ADMIN_IDS = [7521156999] # ⚠️ GANTI INI DENGAN ID TELEGRAM ANDA!
     
-    updater = Updater(BOT_TOKEN, use_context=True)
+    # SEND_QUEUE=on: messages go out through a rate-limited send queue
+    send_queue = outbox.open_outbox()
+    # DISPATCH_WORKERS > 1: handle different users' updates concurrently
+    updater = dispatch.make_updater(BOT_TOKEN, send_queue=send_queue)
     dispatcher = updater.dispatcher
     
     # Command handlers
@@ -840,12 +872,33 @@ def main():
     
     # Message handlers
     dispatcher.add_handler(CallbackQueryHandler(button_handler))
+    dispatcher.add_handler(InlineQueryHandler(inline_menu_search))
     dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_message))
     
+    # Archive completed orders hourly (only this process writes the archive)
+    updater.job_queue.run_repeating(archive_orders, interval=3600, first=60)
+    updater.job_queue.run_repeating(reload_menu, interval=MENU_RELOAD_SECONDS, first=MENU_RELOAD_SECONDS)
+    updater.job_queue.run_repeating(expire_sessions, interval=600, first=600)
+    if status_notifier is not None:
+        status_notifier.start(updater.bot)
+    
     logger.info("🤖 Restaurant Bot + Admin is running...")
     logger.info(f"👑 Admin IDs: {ADMIN_IDS}")
-    updater.start_polling()
-    updater.idle()
+    if webhook.UPDATE_MODE == 'webhook':
+        webhook.run_webhook(updater)
+    else:
+        updater.start_polling()
+        updater.idle()
+    
+    # Let queued updates finish and their replies go out, then commit changes
+    # still waiting in the commit window
+    dispatch.finish_updates(updater)
+    if status_notifier is not None:
+        status_notifier.close()
+    if send_queue is not None:
+        send_queue.close()
+    orders_store.flush()
+    user_sessions.flush()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
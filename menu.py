@@ -0,0 +1,226 @@
+import os
+import re
+import json
+import logging
+import threading
+from functools import lru_cache
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent
+
+logger = logging.getLogger(__name__)
+
+# ==================== CONFIGURATION ====================
+# Menu dan harga dibaca dari file ini; ubah file-nya, bot memuat ulang sendiri
+# tanpa restart (lihat reload_menu)
+MENU_FILE = os.getenv('MENU_FILE', 'menu.json')
+
+# Jumlah item per halaman kategori (pesan & keyboard tetap kecil untuk kategori besar)
+MENU_PAGE_SIZE = int(os.getenv('MENU_PAGE_SIZE', '8'))
+
+# Telegram menerima maksimal 50 hasil per jawaban inline query
+INLINE_RESULTS_LIMIT = 50
+# Jumlah teks pencarian berbeda yang hasilnya disimpan per versi menu
+INLINE_CACHE_SIZE = int(os.getenv('INLINE_CACHE_SIZE', '1024'))
+
+def _tokens(text):
+    return re.findall(r'\w+', text.lower())
+
+# ==================== MENU CATALOG ====================
+class MenuCatalog:
+    """Menu indexed and rendered once per menu version.
+
+    items: item id -> menu item (orders and add_ callbacks only carry ids)
+    menu_view: (text, reply_markup) of the full menu
+    categories_view: (text, reply_markup) of the category list
+    category_views: category -> pages of its item list, each (text, InlineKeyboardMarkup)
+    prefixes: word prefix of an item name/desc -> positions of matching items
+        (in menu order; prefix_sets holds the same positions as sets for intersecting)
+    """
+
+    def __init__(self, menu_items, category_names):
+        self.menu_items = menu_items
+        self.items = {}
+        self.category_views = {}
+
+        menu_text = "\n🍽️ **MENU RESTORAN KAMI** 🍽️\n"
+        category_rows = []
+        for category, items in menu_items.items():
+            name = category_names.get(category, category.upper())
+            category_rows.append([InlineKeyboardButton(name, callback_data=f"category_{category}")])
+            menu_text += f"\n**{name}:**\n"
+            for item in items:
+                if item['id'] in self.items:
+                    raise ValueError(f"Duplicate menu item id {item['id']}")
+                self.items[item['id']] = item
+                menu_text += f"• {item['name']} - Rp {item['price']:,}\n"
+            self.category_views[category] = self._render_category(category, name, items)
+
+        self.menu_view = (menu_text, InlineKeyboardMarkup([
+            [InlineKeyboardButton("🛒 Pesan Sekarang", callback_data="start_order")],
+            [InlineKeyboardButton("📞 Tanya Menu", callback_data="ask_menu")],
+            [InlineKeyboardButton("🔙 Menu Utama", callback_data="back_to_main")]
+        ]))
+
+        category_rows.extend([
+            [InlineKeyboardButton("🛒 Lihat Keranjang", callback_data="view_cart")],
+            [InlineKeyboardButton("🔙 Menu Utama", callback_data="back_to_main")]
+        ])
+        self.categories_markup = InlineKeyboardMarkup(category_rows)
+        self.categories_view = (
+            "📋 **PILIH KATEGORI MENU**\n\nSilakan pilih kategori menu:",
+            self.categories_markup
+        )
+
+        self.item_order = list(self.items)
+        self.prefixes = {}
+        for position, item_id in enumerate(self.item_order):
+            item = self.items[item_id]
+            for token in set(_tokens(f"{item['name']} {item['desc']}")):
+                for end in range(1, len(token) + 1):
+                    self.prefixes.setdefault(token[:end], []).append(position)
+        self.prefix_sets = {prefix: frozenset(positions) for prefix, positions in self.prefixes.items()}
+        self._articles = {}
+        # Results are cached per catalog, so a menu reload starts a fresh cache
+        self.inline_results = lru_cache(maxsize=INLINE_CACHE_SIZE)(self._inline_results)
+
+    @classmethod
+    def from_file(cls, path):
+        """Build a catalog from a menu JSON file ({"categories": {id: {name, items}}})"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        menu_items = {}
+        category_names = {}
+        for category, spec in data['categories'].items():
+            category_names[category] = spec['name']
+            menu_items[category] = [
+                {'id': str(item['id']), 'name': item['name'],
+                 'price': int(item['price']), 'desc': item.get('desc', '')}
+                for item in spec['items']
+            ]
+        return cls(menu_items, category_names)
+
+    @staticmethod
+    def _render_category(category, name, items, page_size=MENU_PAGE_SIZE):
+        """Pages of a category; page n is reached with callback category_<category>:<n>"""
+        page_count = max(1, -(-len(items) // page_size))
+        pages = []
+        for page in range(page_count):
+            page_items = items[page * page_size:(page + 1) * page_size]
+            text = f"{name}\n\n" if page_count == 1 else f"{name} ({page + 1}/{page_count})\n\n"
+            keyboard = []
+            for item in page_items:
+                keyboard.append([
+                    InlineKeyboardButton(
+                        f"➕ {item['name']} - Rp {item['price']:,}",
+                        callback_data=f"add_{item['id']}"
+                    )
+                ])
+                text += f"• {item['name']} - Rp {item['price']:,}\n"
+                text += f"  _{item['desc']}_\n\n"
+
+            nav_row = []
+            if page > 0:
+                nav_row.append(InlineKeyboardButton("◀️ Sebelumnya", callback_data=f"category_{category}:{page - 1}"))
+            if page < page_count - 1:
+                nav_row.append(InlineKeyboardButton("Berikutnya ▶️", callback_data=f"category_{category}:{page + 1}"))
+            if nav_row:
+                keyboard.append(nav_row)
+
+            keyboard.extend([
+                [InlineKeyboardButton("🛒 Lihat Keranjang", callback_data="view_cart")],
+                [InlineKeyboardButton("📋 Kategori Lain", callback_data="view_categories")],
+                [InlineKeyboardButton("🔙 Menu Utama", callback_data="back_to_main")]
+            ])
+            pages.append((text, InlineKeyboardMarkup(keyboard)))
+        return pages
+
+    def get(self, item_id):
+        """Menu item by id, or None"""
+        return self.items.get(item_id)
+
+    def category_view(self, category, page=0):
+        """(text, reply_markup) for a page of a category, or None if unknown"""
+        pages = self.category_views.get(category)
+        if pages is None or not 0 <= page < len(pages):
+            return None
+        return pages[page]
+
+    def search(self, text, limit=INLINE_RESULTS_LIMIT):
+        """Ids of items whose name/desc has a word starting with every query word"""
+        tokens = _tokens(text)
+        if not tokens:
+            return self.item_order[:limit]
+        if any(token not in self.prefixes for token in tokens):
+            return []
+        rarest, *rest = sorted(set(tokens), key=lambda token: len(self.prefixes[token]))
+        if rest:
+            positions = sorted(self.prefix_sets[rarest].intersection(*(self.prefix_sets[token] for token in rest)))
+        else:
+            positions = self.prefixes[rarest]
+        return [self.item_order[position] for position in positions[:limit]]
+
+    def _article(self, item_id):
+        article = self._articles.get(item_id)
+        if article is None:
+            item = self.items[item_id]
+            article = InlineQueryResultArticle(
+                id=item_id,
+                title=f"{item['name']} - Rp {item['price']:,}",
+                description=item['desc'],
+                input_message_content=InputTextMessageContent(
+                    f"🍽️ **{item['name']}** - Rp {item['price']:,}\n_{item['desc']}_",
+                    parse_mode='Markdown'
+                ),
+                reply_markup=InlineKeyboardMarkup([
+                    [InlineKeyboardButton("➕ Tambah ke Keranjang", callback_data=f"add_{item_id}")]
+                ])
+            )
+            self._articles[item_id] = article
+        return article
+
+    def _inline_results(self, text):
+        return [self._article(item_id) for item_id in self.search(text)]
+
+# ==================== HOT RELOAD ====================
+# Handlers read menu.catalog once per update; a reload builds the new catalog
+# off to the side and swaps the module attribute, so an update in flight keeps
+# the version it started with.
+_reload_lock = threading.Lock()
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+catalog = MenuCatalog.from_file(MENU_FILE)
+_catalog_stamp = _file_stamp(MENU_FILE)
+
+def reload_menu(path=None):
+    """Swap in a new catalog if the menu file changed; True if it was swapped.
+
+    A missing or broken file is logged and the current catalog is kept.
+    """
+    global catalog, _catalog_stamp
+    path = path or MENU_FILE
+    with _reload_lock:
+        try:
+            stamp = _file_stamp(path)
+        except OSError as e:
+            logger.warning(f"Menu file {path} unavailable: {e}")
+            return False
+        if stamp == _catalog_stamp:
+            return False
+        try:
+            new_catalog = MenuCatalog.from_file(path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # Remember the stamp so a broken file is reported once, not every poll
+            _catalog_stamp = stamp
+            logger.error(f"Menu file {path} not reloaded: {e}")
+            return False
+        catalog = new_catalog
+        _catalog_stamp = stamp
+    logger.info(f"Menu reloaded from {path}: {len(new_catalog.items)} items")
+    return True
+
+def item_name(item_id):
+    """Menu name of an item (the id itself if it is no longer on the menu)"""
+    item = catalog.get(item_id)
+    return item['name'] if item else item_id
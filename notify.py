@@ -0,0 +1,123 @@
+import os
+import logging
+import threading
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import TelegramError
+
+import outbox
+
+logger = logging.getLogger(__name__)
+
+# ==================== CONFIGURATION ====================
+# NOTIFY_CUSTOMERS=on  -> customer dapat pesan otomatis saat status pesanan berubah (default)
+# NOTIFY_CUSTOMERS=off -> tidak ada notifikasi, customer cek sendiri dengan /status
+NOTIFY_CUSTOMERS = os.getenv('NOTIFY_CUSTOMERS', 'on')
+# Perubahan status dikumpulkan selama ini (detik) lalu dikirim sekaligus;
+# beberapa perubahan cepat pada satu pesanan jadi satu notifikasi
+NOTIFY_BATCH_SECONDS = float(os.getenv('NOTIFY_BATCH_SECONDS', '2'))
+
+STATUS_MESSAGES = {
+    'diproses': "👨‍🍳 Pesanan Anda sedang disiapkan",
+    'dikirim': "🚗 Pesanan Anda sedang dalam perjalanan",
+    'selesai': "✅ Pesanan selesai. Terima kasih sudah memesan!"
+}
+
+# ==================== STATUS NOTIFICATIONS ====================
+def _status_text(order_id, order):
+    status = order['status']
+    text = f"📋 **No. Pesanan:** `{order_id}`\n📊 **Status:** {status.title()}"
+    if status in STATUS_MESSAGES:
+        text += f"\n{STATUS_MESSAGES[status]}"
+    return text
+
+
+class StatusNotifier:
+    """Tells customers about order status changes from a background thread.
+
+    Admin handlers only record the change. Every NOTIFY_BATCH_SECONDS the
+    thread takes what was recorded, reads each order once, and sends each
+    customer one message covering all of their changed orders. Several
+    changes of one order in a window become one notification of its latest
+    status, and none if it ends where it started.
+    """
+
+    def __init__(self, find_order, batch_seconds=NOTIFY_BATCH_SECONDS):
+        self.find_order = find_order
+        self.batch_seconds = batch_seconds
+        self.bot = None
+        self._cond = threading.Condition()
+        # order_id -> status before the first change in this window
+        self._pending = {}
+        self._closed = False
+        self._thread = None
+        self.notified = 0
+        self.collapsed = 0
+
+    def start(self, bot):
+        """Start delivering with `bot` (a QueuedBot sends through the send queue)"""
+        self.bot = bot
+        self._thread = threading.Thread(target=self._run, name='notify', daemon=True)
+        self._thread.start()
+
+    def status_changed(self, order_id, old_status, new_status):
+        """Record a status change; returns at once"""
+        if old_status == new_status:
+            return
+        with self._cond:
+            if order_id in self._pending:
+                self.collapsed += 1
+            else:
+                self._pending[order_id] = old_status
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                # Let rapid successive changes collect (cut short on close)
+                self._cond.wait_for(lambda: self._closed, timeout=self.batch_seconds)
+                batch, self._pending = self._pending, {}
+            try:
+                self._deliver(batch)
+            except Exception:
+                logger.exception(f"Status notifications for {len(batch)} orders failed")
+
+    def _deliver(self, batch):
+        by_user = {}
+        for order_id, old_status in batch.items():
+            order = self.find_order(order_id)
+            if order is None or order['status'] == old_status:
+                continue
+            by_user.setdefault(order['user_id'], []).append(_status_text(order_id, order))
+
+        reply_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📊 Status Pesanan", callback_data="order_status")]
+        ])
+        for user_id, sections in by_user.items():
+            text = "🔔 **UPDATE PESANAN**\n\n" + "\n\n".join(sections)
+            try:
+                self.bot.send_message(user_id, text, reply_markup=reply_markup, parse_mode='Markdown',
+                                      priority=outbox.URGENT)
+            except TelegramError as e:
+                # E.g. the customer blocked the bot; queued sends report failures themselves
+                logger.warning(f"Could not notify customer {user_id}: {e}")
+        self.notified += len(by_user)
+        if by_user:
+            logger.info(f"🔔 Notified {len(by_user)} customers of {len(batch)} order updates")
+
+    def close(self):
+        """Deliver what is still recorded, then stop the thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def open_notifier(find_order):
+    """Create the status notifier selected by NOTIFY_CUSTOMERS, or None"""
+    if NOTIFY_CUSTOMERS != 'on':
+        return None
+    return StatusNotifier(find_order)
@@ -0,0 +1,1044 @@
+import os
+import gzip
+import json
+import re
+import sqlite3
+import uuid
+import logging
+import atexit
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, only threads of this process are serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ==================== CONFIGURATION ====================
+# ORDER_STORAGE=json    -> orders.json ditulis ulang setiap kali save (default)
+# ORDER_STORAGE=journal -> setiap perubahan ditambahkan ke orders.json.log,
+#                          orders.json hanya dipakai sebagai snapshot
+# ORDER_STORAGE=sqlite  -> orders.db (SQLite, WAL) dengan index status/user/waktu
+ORDER_STORAGE = os.getenv('ORDER_STORAGE', 'json')
+ORDERS_DB = os.getenv('ORDERS_DB')
+
+# Journal records replayed before a snapshot + compaction is taken
+JOURNAL_COMPACT_EVERY = int(os.getenv('ORDER_JOURNAL_COMPACT_EVERY', '500'))
+
+# ORDER_FSYNC=always -> fsync setiap commit (aman dari crash/mati listrik, default)
+# ORDER_FSYNC=never  -> serahkan ke OS (lebih cepat, commit terakhir bisa hilang)
+ORDER_FSYNC = os.getenv('ORDER_FSYNC', 'always')
+
+# ORDER_COMMIT_WINDOW_MS=0  -> setiap perubahan langsung di-commit (default)
+# ORDER_COMMIT_WINDOW_MS=50 -> perubahan dalam 50 ms digabung jadi satu commit
+COMMIT_WINDOW = int(os.getenv('ORDER_COMMIT_WINDOW_MS', '0')) / 1000
+
+# Pesanan 'selesai' yang lebih tua dari ini dipindah ke arsip (per hari, gzip)
+ARCHIVE_DIR = os.getenv('ORDER_ARCHIVE_DIR', 'archive')
+ARCHIVE_AFTER_HOURS = int(os.getenv('ORDER_ARCHIVE_AFTER_HOURS', '24'))
+
+
+def _dump_compact(data):
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# ==================== FILE SAFETY ====================
+class FileLock:
+    """Advisory lock shared by all processes using the same orders file.
+
+    flock() on a sidecar `.lock` file serializes read-modify-write cycles
+    between main_bot.py and admin_bot.py; a thread lock does the same for
+    threads of one process. Not re-entrant.
+    """
+
+    def __init__(self, path):
+        self.path = path + '.lock'
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except Exception:
+                self._release()
+                raise
+        return self
+
+    def __exit__(self, *exc):
+        self._release()
+
+    def _release(self):
+        if self._fd is not None:
+            os.close(self._fd)  # closing drops the flock
+            self._fd = None
+        self._thread_lock.release()
+
+
+def _fsync_file(f):
+    if ORDER_FSYNC == 'always':
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _fsync_dir(path):
+    """Persist a rename by syncing the containing directory"""
+    if ORDER_FSYNC != 'always':
+        return
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:  # not supported (Windows)
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path, data):
+    """Replace a file via temp file + rename, readers never see a partial file"""
+    tmp_path = path + '.tmp'
+    if isinstance(data, bytes):
+        f = open(tmp_path, 'wb')
+    else:
+        f = open(tmp_path, 'w', encoding='utf-8')
+    with f:
+        f.write(data)
+        _fsync_file(f)
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+
+# ==================== ORDER ENCODING ====================
+# Order items are stored as [item_id, qty, unit_price] lines; names and
+# descriptions come from the menu. Orders written before this stored one
+# full menu dict per unit; they are upgraded in memory when read
+# (upgrade_orders) and stored compactly on the next rewrite.
+def compact_items(items):
+    """One menu dict per unit -> [[item_id, qty, unit_price], ...]"""
+    lines = {}
+    for item in items:
+        key = (item['id'], item['price'])
+        lines[key] = lines.get(key, 0) + 1
+    return [[item_id, qty, price] for (item_id, price), qty in lines.items()]
+
+
+@dataclass
+class Order:
+    """An order as created at checkout, passed on to persistence and display"""
+    order_id: str
+    user_id: int
+    customer_name: str
+    phone: str
+    address: str
+    items: list  # [[item_id, qty, unit_price], ...]
+    total: int
+    status: str = 'baru'
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    def to_dict(self):
+        """Stored form of the order (the id is the key)"""
+        return {
+            'user_id': self.user_id,
+            'customer_name': self.customer_name,
+            'phone': self.phone,
+            'address': self.address,
+            'items': self.items,
+            'total': self.total,
+            'status': self.status,
+            'timestamp': self.timestamp,
+        }
+
+
+def upgrade_order(order):
+    """Convert a legacy order's items in place, returns the order"""
+    items = order['items']
+    if items and isinstance(items[0], dict):
+        order['items'] = compact_items(items)
+    return order
+
+
+def upgrade_orders(orders):
+    for order in orders.values():
+        upgrade_order(order)
+    return orders
+
+
+# ==================== STATISTICS ====================
+def _stats_summary(total, statuses, day, hours):
+    """Shape of stats(): (orders, revenue) pairs from the running counters"""
+    return {
+        'total_orders': total[0],
+        'total_revenue': total[1],
+        'status_counts': {status: counter[0] for status, counter in statuses.items() if counter[0]},
+        'day_orders': day[0],
+        'day_revenue': day[1],
+        # 'HH' -> (orders, revenue), only hours that had orders
+        'day_hours': {hour: tuple(counter) for hour, counter in hours.items() if counter[0]},
+    }
+
+
+class OrderStats:
+    """Running order/revenue counters: overall, per status, per day, per hour.
+
+    Updated on every create and status change, so stats() never has to
+    look at individual orders.
+    """
+
+    def __init__(self):
+        self.total = [0, 0]
+        self.statuses = {}
+        self.days = {}
+        self.hours = {}
+
+    def add(self, order, sign=1):
+        revenue = order['total'] * sign
+        ts = order['timestamp']
+        for counter in (self.total,
+                        self.statuses.setdefault(order['status'], [0, 0]),
+                        self.days.setdefault(ts[:10], [0, 0]),
+                        self.hours.setdefault(ts[:13], [0, 0])):
+            counter[0] += sign
+            counter[1] += revenue
+
+    def remove(self, order):
+        self.add(order, -1)
+
+    def set_status(self, order, old_status, new_status):
+        old = self.statuses.setdefault(old_status, [0, 0])
+        new = self.statuses.setdefault(new_status, [0, 0])
+        old[0] -= 1
+        old[1] -= order['total']
+        new[0] += 1
+        new[1] += order['total']
+
+    def summary(self, day):
+        hours = {f"{h:02d}": self.hours.get(f"{day}T{h:02d}", (0, 0)) for h in range(24)}
+        return _stats_summary(self.total, self.statuses, self.days.get(day, (0, 0)), hours)
+
+
+# ==================== INDEXES ====================
+class OrderIndex:
+    """Secondary indexes over an orders dict, maintained incrementally.
+
+    by_user:   user_id -> [order_id, ...] in creation order
+    by_status: status  -> {order_id: None} (insertion ordered set)
+    stats:     OrderStats running counters
+    """
+
+    def __init__(self):
+        self.by_user = {}
+        self.by_status = {}
+        self.stats = OrderStats()
+
+    def rebuild(self, orders):
+        """Index all orders from scratch (startup, or file changed elsewhere)"""
+        self.by_user, self.by_status = {}, {}
+        self.stats = OrderStats()
+        for order_id, order in orders.items():
+            self.add(order_id, order)
+
+    def add(self, order_id, order):
+        self.by_user.setdefault(order['user_id'], []).append(order_id)
+        self.by_status.setdefault(order['status'], {})[order_id] = None
+        self.stats.add(order)
+
+    def remove(self, order_id, order):
+        self.by_user[order['user_id']].remove(order_id)
+        self.by_status[order['status']].pop(order_id, None)
+        self.stats.remove(order)
+
+    def set_status(self, order_id, order, new_status):
+        """Move an order to new_status; call before order['status'] is changed"""
+        self.by_status.get(order['status'], {}).pop(order_id, None)
+        self.by_status.setdefault(new_status, {})[order_id] = None
+        self.stats.set_status(order, order['status'], new_status)
+
+
+# ==================== QUERIES ====================
+class _IndexedQueries:
+    """Order queries answered from the OrderIndex of a file based store.
+
+    Subclasses keep self._index in sync with what load() returns.
+    """
+
+    def get_order(self, order_id):
+        """Return a single order or None"""
+        return self.load().get(order_id)
+
+    def orders_by_status(self, status):
+        """Return {order_id: order} with the given status, oldest first"""
+        orders = self.load()
+        order_ids = sorted(self._index.by_status.get(status, ()),
+                           key=lambda order_id: orders[order_id]['timestamp'])
+        return {order_id: orders[order_id] for order_id in order_ids}
+
+    def latest_user_order(self, user_id):
+        """Return (order_id, order) of the user's most recent order, or None"""
+        orders = self.load()
+        order_ids = self._index.by_user.get(user_id)
+        if not order_ids:
+            return None
+        return order_ids[-1], orders[order_ids[-1]]
+
+    def count_by_status(self):
+        """Return {status: number of orders}"""
+        self.load()
+        return {status: len(ids) for status, ids in self._index.by_status.items() if ids}
+
+    def stats(self, day):
+        """Return order/revenue totals, status counts and per-hour totals for one day"""
+        self.load()
+        return self._index.stats.summary(day)
+
+
+# ==================== ORDER IDS ====================
+_WORKER_ID_RE = re.compile(r'[A-Za-z0-9-]{1,8}')
+
+
+class DuplicateOrderError(Exception):
+    """insert_order() found an order with that id already stored"""
+
+
+class OrderIdAllocator:
+    """Allocate order ids like ORD20250101123045-a3f29c-007.
+
+    Time prefix (to the second) for the kitchen, then the worker id and a
+    per-process sequence that restarts every second. The worker id defaults
+    to a random 6-character token taken at startup: process ids repeat
+    across identical containers (often 1 in each). Set WORKER_ID to fix it
+    per process. The clock never goes backwards: if it does, the last second
+    is kept and the sequence keeps counting.
+
+    Order ids end up in admin callback data, which is split on '_' and
+    limited to 64 bytes, so a worker id is at most 8 letters, digits or '-'.
+    """
+
+    def __init__(self, worker_id=None):
+        self.worker_id = str(worker_id or os.getenv('WORKER_ID') or uuid.uuid4().hex[:6])
+        if not _WORKER_ID_RE.fullmatch(self.worker_id):
+            raise ValueError(f"WORKER_ID {self.worker_id!r} must be 1-8 letters, digits or '-'")
+        self._lock = threading.Lock()
+        self._last_ts = ''
+        self._seq = 0
+
+    def next_id(self):
+        """Return a new unique order id"""
+        ts = datetime.now().strftime('%Y%m%d%H%M%S')
+        with self._lock:
+            if ts > self._last_ts:
+                self._last_ts, self._seq = ts, 0
+            self._seq += 1
+            return f"ORD{self._last_ts}-{self.worker_id}-{self._seq:03d}"
+
+
+# ==================== GROUP COMMIT ====================
+class _CommitTimer:
+    """Runs flush() once the commit window after the first pending change closes"""
+
+    def _init_commit_timer(self, commit_window):
+        self.commit_window = commit_window
+        self._flush_timer = None
+        self._timer_lock = threading.Lock()
+
+    def _schedule_flush(self):
+        with self._timer_lock:
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.commit_window, self._timer_flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _cancel_flush(self):
+        with self._timer_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+
+    def _timer_flush(self):
+        with self._timer_lock:
+            self._flush_timer = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Order commit failed, retrying in the next window")
+            self._schedule_flush()
+
+
+class _FileStore(_IndexedQueries, _CommitTimer):
+    """Change handling shared by the JSON and journal stores.
+
+    Every change is a record ({'op': 'put' | 'status' | 'delete', ...})
+    applied to the in-memory orders and index, queued in self._pending and
+    written by _commit_locked(). With commit_window 0 each change is
+    committed before the call returns. Otherwise changes are visible in this
+    process at once and all changes of one window are committed together
+    (group commit); durable=True commits immediately, together with
+    anything already pending. Pending records are re-applied whenever the
+    state is reloaded from disk, so changes from the other process never
+    hide them. All records are idempotent.
+    """
+
+    def __init__(self, path, commit_window):
+        self.path = path
+        self._orders = {}
+        self._index = OrderIndex()
+        self._pending = []
+        self._lock = FileLock(path)
+        # Guards the in-memory state; always taken after self._lock
+        self._state_lock = threading.RLock()
+        self._init_commit_timer(commit_window)
+
+    def _apply(self, record):
+        op = record['op']
+        if op == 'put':
+            old = self._orders.get(record['id'])
+            if old is not None:
+                self._index.remove(record['id'], old)
+            self._orders[record['id']] = upgrade_order(record['order'])
+            self._index.add(record['id'], record['order'])
+        elif op == 'status':
+            order = self._orders.get(record['id'])
+            if order is not None:
+                self._index.set_status(record['id'], order, record['status'])
+                order['status'] = record['status']
+        elif op == 'delete':
+            for order_id in record['ids']:
+                order = self._orders.pop(order_id, None)
+                if order is not None:
+                    self._index.remove(order_id, order)
+        elif op != 'begin':
+            logger.warning(f"Unknown order record: {op}")
+
+    def _reapply_pending(self):
+        for record in self._pending:
+            self._apply(record)
+
+    def _change(self, record, durable=False):
+        if self.commit_window and not durable:
+            self._refresh()
+            with self._state_lock:
+                self._apply(record)
+                self._pending.append(record)
+            self._schedule_flush()
+            return
+        with self._lock:
+            self._refresh(locked=True)
+            with self._state_lock:
+                self._apply(record)
+                self._pending.append(record)
+                self._cancel_flush()
+                self._commit_locked()
+
+    def flush(self):
+        """Commit pending changes now (end of the commit window, shutdown)"""
+        with self._lock:
+            self._refresh(locked=True)
+            with self._state_lock:
+                self._cancel_flush()
+                if self._pending:
+                    self._commit_locked()
+
+    def load(self):
+        """Return all orders (shared state, treat as read-only)"""
+        self._refresh()
+        return self._orders
+
+    def save(self, orders):
+        """Replace all orders"""
+        with self._lock:
+            with self._state_lock:
+                self._cancel_flush()
+                self._orders = upgrade_orders(orders)
+                self._index.rebuild(orders)
+                self._pending = []
+                self._save_locked()
+
+    def put_order(self, order_id, order, durable=False):
+        """Insert or replace a single order"""
+        self._change({'op': 'put', 'id': order_id, 'order': order}, durable)
+
+    def insert_order(self, order_id, order):
+        """Store a new order and commit it at once; DuplicateOrderError if the id is taken"""
+        with self._lock:
+            self._refresh(locked=True)
+            with self._state_lock:
+                if order_id in self._orders:
+                    raise DuplicateOrderError(order_id)
+                record = {'op': 'put', 'id': order_id, 'order': order}
+                self._apply(record)
+                self._pending.append(record)
+                self._cancel_flush()
+                self._commit_locked()
+
+    def update_status(self, order_id, status, durable=False):
+        """Change an order's status, returns the old status (None if not found)"""
+        order = self.get_order(order_id)
+        if order is None:
+            return None
+        old_status = order['status']
+        self._change({'op': 'status', 'id': order_id, 'status': status}, durable)
+        return old_status
+
+    def remove_orders(self, order_ids, durable=False):
+        """Delete orders (e.g. after archiving them)"""
+        self._change({'op': 'delete', 'ids': list(order_ids)}, durable)
+
+
+# ==================== JSON FILE STORE ====================
+class JsonOrderStore(_FileStore):
+    """Orders kept in a single JSON file, rewritten on every commit.
+
+    The parsed file is cached per process and validated with a stat() of the
+    file (mtime, size, inode): repeated loads only re-parse orders.json when
+    it was changed, e.g. by the other bot process. The OrderIndex is rebuilt
+    on re-parse and updated in place on local changes.
+
+    Commits hold the FileLock for the whole read-modify-write and write with
+    an atomic rename, so concurrent updates from the worker and admin
+    processes are not lost and a crash never leaves a truncated file.
+    """
+
+    def __init__(self, path, commit_window=0):
+        super().__init__(path, commit_window)
+        self._sig = None
+
+    @staticmethod
+    def _signature(st):
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _refresh(self, locked=False):
+        """Re-parse the file if it changed since it was last read or written"""
+        # Files are replaced atomically, no need for the FileLock to read them
+        with self._state_lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                if self._sig is not None:
+                    self._sig = None
+                    self._orders = {}
+                    self._index.rebuild(self._orders)
+                    self._reapply_pending()
+                return
+            if self._signature(st) == self._sig:
+                return
+            with open(self.path, 'r', encoding='utf-8') as f:
+                # Signature of the file actually read, not of the earlier stat()
+                self._sig = self._signature(os.fstat(f.fileno()))
+                self._orders = upgrade_orders(json.load(f))
+            self._index.rebuild(self._orders)
+            self._reapply_pending()
+
+    def _commit_locked(self):
+        write_atomic(self.path, _dump_compact(self._orders))
+        self._sig = self._signature(os.stat(self.path))
+        self._pending = []
+
+    def _save_locked(self):
+        self._commit_locked()
+
+
+# ==================== JOURNAL STORE ====================
+class JournalOrderStore(_FileStore):
+    """Snapshot file plus an append-only JSON-lines journal of changes.
+
+    Each commit appends compact records instead of rewriting every order.
+    The in-memory state is the snapshot with the journal replayed on top; only
+    records appended since the last read are parsed, so other processes'
+    writes are picked up incrementally. Once JOURNAL_COMPACT_EVERY records
+    have accumulated the state is written back as a new snapshot and the
+    journal is started over, which keeps replay time bounded.
+
+    Every journal starts with a `begin` record carrying a unique generation
+    id; a different first line means the journal was compacted and the state
+    is rebuilt from the new snapshot. Appends, compaction and rebuilds hold
+    the FileLock, so no record is appended to a journal that is being
+    replaced and a snapshot is never paired with the wrong journal.
+    The OrderIndex is rebuilt with the snapshot and updated per record.
+    """
+
+    def __init__(self, path, journal_path=None, compact_every=JOURNAL_COMPACT_EVERY, commit_window=0):
+        super().__init__(path, commit_window)
+        self.journal_path = journal_path or path + '.log'
+        self.compact_every = compact_every
+        self._journal_sig = None
+        self._journal_head = None
+        self._offset = 0
+        self._partial_tail = False
+        self._replayed = 0
+
+    def _load_snapshot(self):
+        try:
+            return upgrade_orders(_read_json(self.path))
+        except FileNotFoundError:
+            return {}
+
+    def _refresh(self, locked=False):
+        """Bring the in-memory state up to date with the journal"""
+        with self._state_lock:
+            if self._refresh_state(allow_rebuild=locked):
+                return
+        # Journal was replaced: rebuild while no one can compact again
+        with self._lock:
+            with self._state_lock:
+                self._refresh_state(allow_rebuild=True)
+
+    def _refresh_state(self, allow_rebuild):
+        """Replay new records, returns False if a rebuild is needed but not allowed"""
+        try:
+            st = os.stat(self.journal_path)
+            sig = (st.st_ino, st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            sig = None
+        if sig is not None and sig == self._journal_sig:
+            return True
+
+        head, chunk = b'', b''
+        try:
+            f = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            f = None
+        if f is not None:
+            with f:
+                st = os.fstat(f.fileno())
+                sig = (st.st_ino, st.st_size, st.st_mtime_ns)
+                head = f.readline()
+                if not head.startswith(b'{"op":"begin"'):
+                    head = b''  # no header, replay from the start
+                if head == self._journal_head and st.st_size >= self._offset:
+                    f.seek(self._offset)
+                    chunk = f.read()
+                elif not allow_rebuild:
+                    return False
+                else:
+                    f.seek(len(head))
+                    chunk = f.read()
+                    self._rebuild(head)
+        elif self._journal_head != b'':
+            if not allow_rebuild:
+                return False
+            self._rebuild(b'')
+
+        # Only replay complete lines; a partially written record is picked up next time
+        end = chunk.rfind(b'\n') + 1
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping corrupt journal record: {line[:80]!r}")
+                continue
+            self._apply(record)
+            self._replayed += 1
+        if end:
+            # Our uncommitted changes come after anything replayed from disk
+            self._reapply_pending()
+        self._offset += end
+        self._partial_tail = end < len(chunk)
+        self._journal_sig = sig
+        return True
+
+    def _rebuild(self, head):
+        self._orders = self._load_snapshot()
+        self._index.rebuild(self._orders)
+        self._reapply_pending()
+        self._journal_head = head
+        self._offset = len(head)
+        self._replayed = 0
+
+    def _commit_locked(self):
+        if not self._journal_head:
+            # Missing or header-less journal: the snapshot starts a new generation
+            self._save_locked()
+            return
+        lines = ''.join(_dump_compact(record) + '\n' for record in self._pending)
+        if self._partial_tail:
+            # Leftover of a crashed write, terminate it so it is skipped on replay
+            lines = '\n' + lines
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            _fsync_file(f)
+        self._pending = []
+        # Reads our own records back (they are idempotent) and anything before them
+        self._refresh(locked=True)
+        if self._replayed >= self.compact_every:
+            self._save_locked()
+            logger.info(f"Order journal compacted ({len(self._orders)} orders)")
+
+    def _save_locked(self):
+        """Write the in-memory state as the snapshot and start a new journal"""
+        write_atomic(self.path, _dump_compact(self._orders))
+        # Replace the journal with a new generation, other processes rebuild
+        head = _dump_compact({'op': 'begin', 'gen': uuid.uuid4().hex}) + '\n'
+        write_atomic(self.journal_path, head)
+        self._pending = []
+        self._journal_sig = None
+        self._journal_head = head.encode()
+        self._offset = len(self._journal_head)
+        self._partial_tail = False
+        self._replayed = 0
+
+    def compact(self):
+        """Write the current state as a snapshot and start a fresh journal"""
+        with self._lock:
+            self._refresh(locked=True)
+            with self._state_lock:
+                self._cancel_flush()
+                self._save_locked()
+        logger.info(f"Order journal compacted ({len(self._orders)} orders)")
+
+
+# ==================== SQLITE STORE ====================
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status, timestamp);
+CREATE INDEX IF NOT EXISTS idx_orders_user ON orders (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_orders_timestamp ON orders (timestamp);
+
+-- Running totals kept by the triggers below: 'all', 'status:<status>',
+-- 'day:YYYY-MM-DD' and 'hour:YYYY-MM-DDTHH'
+CREATE TABLE IF NOT EXISTS order_counters (
+    bucket TEXT PRIMARY KEY,
+    orders INTEGER NOT NULL,
+    revenue INTEGER NOT NULL
+);
+"""
+
+
+def _counter_updates(row, sign):
+    """Trigger statements adding (sign='') or removing (sign='-') one row"""
+    buckets = ("'all'",
+               f"'status:' || {row}.status",
+               f"'day:' || substr({row}.timestamp, 1, 10)",
+               f"'hour:' || substr({row}.timestamp, 1, 13)")
+    return ''.join(
+        f"    INSERT INTO order_counters VALUES ({bucket}, {sign}1, {sign}{row}.total)\n"
+        f"        ON CONFLICT (bucket) DO UPDATE SET orders = orders + excluded.orders,\n"
+        f"        revenue = revenue + excluded.revenue;\n"
+        for bucket in buckets)
+
+
+SQLITE_SCHEMA += f"""
+CREATE TRIGGER IF NOT EXISTS orders_count_insert AFTER INSERT ON orders BEGIN
+{_counter_updates('NEW', '')}END;
+CREATE TRIGGER IF NOT EXISTS orders_count_delete AFTER DELETE ON orders BEGIN
+{_counter_updates('OLD', '-')}END;
+CREATE TRIGGER IF NOT EXISTS orders_count_update AFTER UPDATE ON orders BEGIN
+{_counter_updates('OLD', '-')}{_counter_updates('NEW', '')}END;
+"""
+
+SQLITE_REBUILD_COUNTERS = """
+DELETE FROM order_counters;
+INSERT INTO order_counters SELECT 'all', COUNT(*), SUM(total) FROM orders;
+INSERT INTO order_counters SELECT 'status:' || status, COUNT(*), SUM(total)
+    FROM orders GROUP BY status;
+INSERT INTO order_counters SELECT 'day:' || substr(timestamp, 1, 10), COUNT(*), SUM(total)
+    FROM orders GROUP BY substr(timestamp, 1, 10);
+INSERT INTO order_counters SELECT 'hour:' || substr(timestamp, 1, 13), COUNT(*), SUM(total)
+    FROM orders GROUP BY substr(timestamp, 1, 13);
+"""
+
+
+class SqliteOrderStore(_CommitTimer):
+    """Orders in SQLite (WAL mode), queried through indexes.
+
+    status, user_id, timestamp and total are real columns so the admin
+    filters, /status and the daily statistics are index lookups; the rest of
+    the order is stored as JSON in `data`. The status column is authoritative.
+    Triggers keep the order_counters table up to date in the same
+    transaction as each write, so stats() reads a handful of rows.
+
+    With a commit window, writes go into one open transaction that is
+    committed when the window closes. Reads on this connection already see
+    them; the other process sees them after the commit. The database write
+    lock is held for at most one window.
+    """
+
+    def __init__(self, db_path, import_from=None, commit_window=0):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._init_commit_timer(commit_window)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # WAL + NORMAL is crash safe; FULL also survives power loss
+        self._conn.execute('PRAGMA synchronous=' + ('FULL' if ORDER_FSYNC == 'always' else 'NORMAL'))
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.executescript(SQLITE_SCHEMA)
+        if (self._conn.execute('SELECT 1 FROM orders LIMIT 1').fetchone()
+                and not self._conn.execute("SELECT 1 FROM order_counters WHERE bucket = 'all'").fetchone()):
+            # Database from before the counters existed
+            self._conn.executescript('BEGIN IMMEDIATE;' + SQLITE_REBUILD_COUNTERS + 'COMMIT;')
+        if import_from:
+            self._import_json(import_from)
+
+    def _import_json(self, path):
+        """One-off import of an existing orders.json into an empty database"""
+        if self._conn.execute('SELECT 1 FROM orders LIMIT 1').fetchone():
+            return
+        try:
+            orders = upgrade_orders(_read_json(path))
+        except FileNotFoundError:
+            return
+        if orders:
+            self.save(orders)
+            logger.info(f"Imported {len(orders)} orders from {path} into {self.db_path}")
+
+    @staticmethod
+    def _row(order_id, order):
+        return (order_id, order['user_id'], order['status'], order['timestamp'],
+                order['total'], _dump_compact(order))
+
+    @staticmethod
+    def _order(status, data):
+        order = upgrade_order(json.loads(data))
+        order['status'] = status
+        return order
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def load(self):
+        """Return all orders, oldest first"""
+        rows = self._query('SELECT order_id, status, data FROM orders ORDER BY timestamp')
+        return {order_id: self._order(status, data) for order_id, status, data in rows}
+
+    @contextmanager
+    def _change(self, durable=False):
+        """Run writes in the open group-commit transaction (see flush)"""
+        with self._lock:
+            if not self._conn.in_transaction:
+                self._conn.execute('BEGIN IMMEDIATE')
+            # A failing change only rolls back itself, not the rest of the batch
+            self._conn.execute('SAVEPOINT change')
+            try:
+                yield self._conn
+                self._conn.execute('RELEASE change')
+            except Exception:
+                self._conn.execute('ROLLBACK TO change')
+                self._conn.execute('RELEASE change')
+                raise
+            finally:
+                if self.commit_window and not durable:
+                    self._schedule_flush()
+                else:
+                    self._cancel_flush()
+                    self._conn.execute('COMMIT')
+
+    def flush(self):
+        """Commit the open group-commit transaction now"""
+        with self._lock:
+            self._cancel_flush()
+            if self._conn.in_transaction:
+                self._conn.execute('COMMIT')
+
+    def save(self, orders):
+        """Replace all orders"""
+        with self._change(durable=True) as conn:
+            conn.execute('DELETE FROM orders')
+            conn.executemany('INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?)',
+                             [self._row(k, v) for k, v in orders.items()])
+
+    def put_order(self, order_id, order, durable=False):
+        """Insert or replace a single order"""
+        with self._change(durable) as conn:
+            # Upsert rather than INSERT OR REPLACE: REPLACE skips the delete trigger
+            conn.execute('INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?) '
+                         'ON CONFLICT (order_id) DO UPDATE SET user_id = excluded.user_id, '
+                         'status = excluded.status, timestamp = excluded.timestamp, '
+                         'total = excluded.total, data = excluded.data',
+                         self._row(order_id, order))
+
+    def insert_order(self, order_id, order):
+        """Store a new order and commit it at once; DuplicateOrderError if the id is taken"""
+        try:
+            with self._change(durable=True) as conn:
+                conn.execute('INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?)', self._row(order_id, order))
+        except sqlite3.IntegrityError:
+            raise DuplicateOrderError(order_id) from None
+
+    def update_status(self, order_id, status, durable=False):
+        """Change an order's status, returns the old status (None if not found)"""
+        with self._change(durable) as conn:
+            row = conn.execute('SELECT status FROM orders WHERE order_id = ?', (order_id,)).fetchone()
+            if row:
+                conn.execute('UPDATE orders SET status = ? WHERE order_id = ?', (status, order_id))
+        return row[0] if row else None
+
+    def remove_orders(self, order_ids, durable=False):
+        """Delete orders (e.g. after archiving them)"""
+        with self._change(durable) as conn:
+            conn.executemany('DELETE FROM orders WHERE order_id = ?',
+                             [(order_id,) for order_id in order_ids])
+
+    def get_order(self, order_id):
+        """Return a single order or None"""
+        rows = self._query('SELECT status, data FROM orders WHERE order_id = ?', (order_id,))
+        return self._order(*rows[0]) if rows else None
+
+    def orders_by_status(self, status):
+        """Return {order_id: order} with the given status, oldest first"""
+        rows = self._query('SELECT order_id, status, data FROM orders '
+                           'WHERE status = ? ORDER BY timestamp', (status,))
+        return {order_id: self._order(st, data) for order_id, st, data in rows}
+
+    def latest_user_order(self, user_id):
+        """Return (order_id, order) of the user's most recent order, or None"""
+        rows = self._query('SELECT order_id, status, data FROM orders '
+                           'WHERE user_id = ? ORDER BY timestamp DESC LIMIT 1', (user_id,))
+        if not rows:
+            return None
+        order_id, status, data = rows[0]
+        return order_id, self._order(status, data)
+
+    def _counters(self, low, high):
+        rows = self._query('SELECT bucket, orders, revenue FROM order_counters '
+                           'WHERE bucket >= ? AND bucket < ?', (low, high))
+        return {bucket[len(low):]: (orders, revenue) for bucket, orders, revenue in rows}
+
+    def count_by_status(self):
+        """Return {status: number of orders}"""
+        # ';' sorts right after ':', so this is every 'status:...' bucket
+        return {status: counter[0] for status, counter in self._counters('status:', 'status;').items()
+                if counter[0]}
+
+    def stats(self, day):
+        """Return order/revenue totals, status counts and per-hour totals for one day"""
+        total = self._counters('all', 'all\0').get('', (0, 0))
+        day_total = self._counters(f'day:{day}', f'day:{day}\0').get('', (0, 0))
+        hours = self._counters(f'hour:{day}T', f'hour:{day}U')
+        return _stats_summary(total, self._counters('status:', 'status;'), day_total, hours)
+
+
+# ==================== ARCHIVE ====================
+class OrderArchive:
+    """Cold storage for completed orders, one gzip JSON partition per day.
+
+    archive/orders-YYYY-MM-DD.json.gz holds {order_id: order} for that day;
+    archive/index.json keeps per-day totals and each user's latest archived
+    order, so stats and /status can include the archive without opening the
+    partitions. Nothing here is read unless a handler asks for old orders.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self._lock = FileLock(os.path.join(directory, 'archive'))
+
+    def _partition_path(self, day):
+        return os.path.join(self.directory, f"orders-{day}.json.gz")
+
+    def load_day(self, day):
+        """Return {order_id: order} archived for one day"""
+        try:
+            with gzip.open(self._partition_path(day), 'rt', encoding='utf-8') as f:
+                return upgrade_orders(json.load(f))
+        except FileNotFoundError:
+            return {}
+
+    def load_index(self):
+        try:
+            return _read_json(self.index_path)
+        except FileNotFoundError:
+            return {'days': {}, 'users': {}}
+
+    def add(self, orders):
+        """Merge orders into their day partitions (idempotent)"""
+        by_day = {}
+        for order_id, order in orders.items():
+            by_day.setdefault(order['timestamp'][:10], {})[order_id] = order
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            index = self.load_index()
+            for day, day_orders in by_day.items():
+                partition = self.load_day(day)
+                partition.update(day_orders)
+                write_atomic(self._partition_path(day),
+                             gzip.compress(_dump_compact(partition).encode('utf-8')))
+                index['days'][day] = [len(partition), sum(o['total'] for o in partition.values())]
+                for order_id, order in day_orders.items():
+                    latest = index['users'].get(str(order['user_id']))
+                    if latest is None or latest[1] <= order['timestamp']:
+                        index['users'][str(order['user_id'])] = [order_id, order['timestamp']]
+            write_atomic(self.index_path, _dump_compact(index))
+
+    def get_order(self, order_id):
+        """Return an archived order or None"""
+        # ORDyyyymmdd...: the order was stamped on that day, or just after midnight
+        try:
+            day = datetime.strptime(order_id[3:11], '%Y%m%d').date()
+        except ValueError:
+            return None
+        for candidate in (day, day + timedelta(days=1)):
+            order = self.load_day(candidate.isoformat()).get(order_id)
+            if order is not None:
+                return order
+        return None
+
+    def latest_user_order(self, user_id):
+        """Return (order_id, order) of the user's latest archived order, or None"""
+        latest = self.load_index()['users'].get(str(user_id))
+        if latest is None:
+            return None
+        order = self.get_order(latest[0])
+        return (latest[0], order) if order is not None else None
+
+    def totals(self, day):
+        """Return archived order/revenue totals, overall and for one day"""
+        days = self.load_index()['days']
+        day_orders, day_revenue = days.get(day, (0, 0))
+        return {
+            'total_orders': sum(counter[0] for counter in days.values()),
+            'total_revenue': sum(counter[1] for counter in days.values()),
+            'day_orders': day_orders,
+            'day_revenue': day_revenue,
+        }
+
+
+def archive_completed(store, archive, max_age_hours=ARCHIVE_AFTER_HOURS):
+    """Move completed orders older than max_age_hours from the store to the archive"""
+    cutoff = (datetime.now() - timedelta(hours=max_age_hours)).isoformat()
+    old_orders = {order_id: order for order_id, order in store.orders_by_status('selesai').items()
+                  if order['timestamp'] < cutoff}
+    if not old_orders:
+        return 0
+    # Archive first: a crash in between leaves a duplicate, never a lost order
+    archive.add(old_orders)
+    store.remove_orders(list(old_orders))
+    logger.info(f"📦 Archived {len(old_orders)} completed orders")
+    return len(old_orders)
+
+
+def open_store(path):
+    """Create the order store selected by ORDER_STORAGE"""
+    if ORDER_STORAGE == 'journal':
+        logger.info(f"📒 Order storage: journal ({path}.log)")
+        store = JournalOrderStore(path, commit_window=COMMIT_WINDOW)
+    elif ORDER_STORAGE == 'sqlite':
+        db_path = ORDERS_DB or os.path.splitext(path)[0] + '.db'
+        logger.info(f"🗄️ Order storage: sqlite ({db_path})")
+        store = SqliteOrderStore(db_path, import_from=path, commit_window=COMMIT_WINDOW)
+    else:
+        store = JsonOrderStore(path, commit_window=COMMIT_WINDOW)
+    # Last chance for pending group-commit changes; main() also flushes on shutdown
+    atexit.register(store.flush)
+    return store
@@ -0,0 +1,317 @@
+import os
+import time
+import heapq
+import logging
+import itertools
+import threading
+from concurrent.futures import Future
+from telegram.error import RetryAfter, TimedOut, NetworkError, BadRequest
+from telegram.ext import ExtBot
+
+logger = logging.getLogger(__name__)
+
+# ==================== CONFIGURATION ====================
+# SEND_QUEUE=on  -> pesan & edit pesan dikirim lewat antrean dengan batas kecepatan (default)
+# SEND_QUEUE=off -> dikirim langsung dari handler seperti dulu
+SEND_QUEUE = os.getenv('SEND_QUEUE', 'on')
+# Telegram membatasi sekitar 30 pesan/detik untuk semua chat; sisakan ruang
+SEND_RATE_GLOBAL = float(os.getenv('SEND_RATE_GLOBAL', '25'))
+# Per chat pribadi: sekitar 1 pesan/detik, boleh beberapa sekaligus
+SEND_RATE_CHAT = float(os.getenv('SEND_RATE_CHAT', '1'))
+SEND_BURST_CHAT = int(os.getenv('SEND_BURST_CHAT', '3'))
+# Per grup: maksimal 20 pesan/menit
+SEND_RATE_GROUP = float(os.getenv('SEND_RATE_GROUP', str(20 / 60)))
+# Thread yang memanggil Bot API untuk antrean
+SEND_THREADS = int(os.getenv('SEND_THREADS', '4'))
+# Percobaan kirim saat koneksi gagal (429 selalu diulang sesuai retry_after)
+SEND_MAX_ATTEMPTS = 3
+
+# Priority classes, sent in this order when messages wait for the rate limit
+URGENT = 0  # checkout confirmations, admin alerts, customer notifications
+NORMAL = 1  # replies to commands and messages
+LOW = 2     # menu, category and cart refreshes (message edits)
+
+# ==================== RATE LIMITS ====================
+class TokenBucket:
+    """`rate` sends per second on average, up to `capacity` at once"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'stamp')
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = now
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self, now):
+        """Seconds until a send is allowed (0 if one is allowed now)"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, now, seconds):
+        """Allow no send for `seconds` (Telegram's retry_after)"""
+        self._refill(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    def is_full(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+# ==================== SEND QUEUE ====================
+_IDLE, _READY, _DELAYED, _SENDING = range(4)
+
+
+class _Chat:
+    __slots__ = ('pending', 'replaceable', 'bucket', 'state')
+
+    def __init__(self, bucket):
+        # Heap of (priority, seq, [fn, args, kwargs, future, attempts, replace_key])
+        self.pending = []
+        # replace_key -> queued call not sent yet
+        self.replaceable = {}
+        self.bucket = bucket
+        self.state = _IDLE
+
+
+class Outbox:
+    """Queue of Bot API calls sent by a few threads within Telegram's rate limits.
+
+    Calls wait per chat, in priority order, then submission order. A chat
+    is ready when its bucket allows a send; ready chats are served by the
+    priority of their first call as the global bucket allows. At most one
+    call per chat is in flight, so a chat's messages arrive in order. On a
+    429 the call goes back to the front of its chat, and the chat waits
+    retry_after seconds; other chats keep going.
+
+    A call with a replace_key (e.g. edits of one message) that is still
+    queued is replaced by a newer call with the same key: only the latest
+    text of a message is sent when taps outpace the chat's limit.
+    """
+
+    def __init__(self, global_rate=SEND_RATE_GLOBAL, chat_rate=SEND_RATE_CHAT, chat_burst=SEND_BURST_CHAT,
+                 group_rate=SEND_RATE_GROUP, threads=SEND_THREADS):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self._cond = threading.Condition()
+        # A burst of a fifth of a second: at most 1.2 x global_rate in any one second
+        self._global = TokenBucket(global_rate, max(1.0, global_rate / 5), time.monotonic())
+        self._chats = {}
+        # (priority, seq, chat) of ready chats; entries no longer matching the chat's first call are skipped
+        self._ready = []
+        # (ready_at, chat) of chats waiting for their bucket
+        self._delayed = []
+        self._seq = itertools.count()
+        self._queued = 0
+        self._sweep_at = 1024
+        self._closed = False
+        self.sent = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.replaced = 0
+        self._threads = [threading.Thread(target=self._run, name=f'outbox-{i}', daemon=True)
+                         for i in range(threads)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, chat_id, priority, fn, *args, replace_key=None, **kwargs):
+        """Queue fn(*args, **kwargs) as a send to chat_id; returns a Future of its result"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Outbox is closed")
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                if len(self._chats) >= self._sweep_at:
+                    self._sweep()
+                rate = self.group_rate if isinstance(chat_id, int) and chat_id < 0 else self.chat_rate
+                chat = self._chats[chat_id] = _Chat(TokenBucket(rate, self.chat_burst, time.monotonic()))
+            call = chat.replaceable.get(replace_key) if replace_key is not None else None
+            if call is not None:
+                # Keeps its place in the queue; both callers get the newer call's result
+                call[0:3] = fn, args, kwargs
+                self.replaced += 1
+                return call[3]
+            future = Future()
+            seq = next(self._seq)
+            call = [fn, args, kwargs, future, 0, replace_key]
+            if replace_key is not None:
+                chat.replaceable[replace_key] = call
+            heapq.heappush(chat.pending, (priority, seq, call))
+            self._queued += 1
+            if chat.state == _IDLE or (chat.state == _READY and chat.pending[0][1] == seq):
+                chat.state = _READY
+                heapq.heappush(self._ready, (priority, seq, chat_id))
+            self._cond.notify()
+        return future
+
+    def _sweep(self):
+        # Forget idle chats whose bucket is full again; a new bucket would be the same
+        now = time.monotonic()
+        for chat_id in [chat_id for chat_id, chat in self._chats.items()
+                        if chat.state == _IDLE and chat.bucket.is_full(now)]:
+            del self._chats[chat_id]
+        self._sweep_at = max(1024, 2 * len(self._chats))
+
+    def _next_job(self):
+        # Called with self._cond held; None once closed and empty
+        while True:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, chat_id = heapq.heappop(self._delayed)
+                chat = self._chats[chat_id]
+                chat.state = _READY
+                heapq.heappush(self._ready, (*chat.pending[0][:2], chat_id))
+            while self._ready:
+                priority, seq, chat_id = self._ready[0]
+                # Left-behind entries may name a chat that _sweep has forgotten since
+                chat = self._chats.get(chat_id)
+                if chat is not None and chat.state == _READY and chat.pending[0][1] == seq:
+                    break
+                heapq.heappop(self._ready)
+
+            timeout = self._delayed[0][0] - now if self._delayed else None
+            if self._ready:
+                global_wait = self._global.wait_time(now)
+                if global_wait <= 0:
+                    _, _, chat_id = heapq.heappop(self._ready)
+                    chat = self._chats[chat_id]
+                    chat_wait = chat.bucket.wait_time(now)
+                    if chat_wait > 0:
+                        chat.state = _DELAYED
+                        heapq.heappush(self._delayed, (now + chat_wait, chat_id))
+                        continue
+                    self._global.take(now)
+                    chat.bucket.take(now)
+                    chat.state = _SENDING
+                    entry = heapq.heappop(chat.pending)
+                    chat.replaceable.pop(entry[2][5], None)
+                    return chat_id, entry
+                timeout = global_wait if timeout is None else min(timeout, global_wait)
+            elif self._closed and self._queued == 0:
+                return None
+            self._cond.wait(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+            if job is None:
+                return
+            chat_id, (priority, seq, call) = job
+            fn, args, kwargs, future, attempts, _ = call
+            retry_after = None
+            try:
+                result = fn(*args, **kwargs)
+            except RetryAfter as e:
+                logger.warning(f"Rate limited sending to {chat_id}, retrying in {e.retry_after}s")
+                retry_after = e.retry_after
+            except (TimedOut, BadRequest) as e:
+                # A timed out send may still have been delivered; do not send it twice
+                self._fail(chat_id, future, e)
+            except NetworkError as e:
+                call[4] = attempts + 1
+                if call[4] < SEND_MAX_ATTEMPTS:
+                    logger.warning(f"Send to {chat_id} failed ({e}), retrying")
+                    retry_after = 1
+                else:
+                    self._fail(chat_id, future, e)
+            except Exception as e:
+                self._fail(chat_id, future, e)
+            else:
+                future.set_result(result)
+            self._done(chat_id, (priority, seq, call), future, retry_after)
+
+    def _fail(self, chat_id, future, error):
+        logger.warning(f"Send to {chat_id} failed: {error}")
+        future.set_exception(error)
+
+    def _done(self, chat_id, entry, future, retry_after):
+        with self._cond:
+            now = time.monotonic()
+            chat = self._chats[chat_id]
+            if retry_after is not None:
+                # Back to the front of the chat, which waits retry_after seconds
+                heapq.heappush(chat.pending, entry)
+                chat.bucket.pause(now, retry_after)
+                self.rate_limited += 1
+            else:
+                self._queued -= 1
+                if future.exception() is None:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+            if not chat.pending:
+                chat.state = _IDLE
+            else:
+                wait = chat.bucket.wait_time(now)
+                if wait > 0:
+                    chat.state = _DELAYED
+                    heapq.heappush(self._delayed, (now + wait, chat_id))
+                else:
+                    chat.state = _READY
+                    heapq.heappush(self._ready, (*chat.pending[0][:2], chat_id))
+            self._cond.notify_all()
+
+    def close(self):
+        """Send everything still queued, then stop the threads"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def metrics(self):
+        """Queued calls and send counters"""
+        return {
+            'queued': self._queued,
+            'sent': self.sent,
+            'failed': self.failed,
+            'rate_limited': self.rate_limited,
+            'replaced': self.replaced,
+        }
+
+
+class QueuedBot(ExtBot):
+    """ExtBot whose send_message and edit_message_text go through an Outbox.
+
+    Handlers keep calling reply_text / edit_message_text; those return a
+    Future instead of the Message. `priority` picks the class (sends are
+    NORMAL, edits LOW by default); a queued edit of a message is replaced
+    by a newer edit of it. Without an outbox the calls are direct.
+    Callback and inline query answers are never queued: Telegram expects
+    them within seconds and they do not count as messages to a chat.
+    """
+
+    def __init__(self, *args, outbox=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.outbox = outbox
+
+    def send_message(self, chat_id, text, *args, priority=NORMAL, **kwargs):
+        if self.outbox is None:
+            return super().send_message(chat_id, text, *args, **kwargs)
+        return self.outbox.submit(chat_id, priority, super().send_message, chat_id, text, *args, **kwargs)
+
+    def edit_message_text(self, text, chat_id=None, message_id=None, inline_message_id=None, *args,
+                          priority=LOW, **kwargs):
+        send = super().edit_message_text
+        if self.outbox is None:
+            return send(text, chat_id, message_id, inline_message_id, *args, **kwargs)
+        key = chat_id if chat_id is not None else inline_message_id
+        return self.outbox.submit(key, priority, send, text, chat_id, message_id, inline_message_id, *args,
+                                  replace_key=message_id or inline_message_id, **kwargs)
+
+
+def open_outbox():
+    """Create the send queue selected by SEND_QUEUE, or None for direct sends"""
+    if SEND_QUEUE != 'on':
+        return None
+    logger.info(f"📤 Send queue: {SEND_RATE_GLOBAL:g} msg/s total, {SEND_RATE_CHAT:g} msg/s per chat")
+    return Outbox()
@@ -0,0 +1,30 @@
+# ==================== RENDER CACHE ====================
+# Static screens (start, menu, help, ...) are the same for every user with the
+# same role and locale, so their text and keyboards are built once and reused.
+from functools import lru_cache
+
+# Locales with translated screens; other Telegram languages get the default
+DEFAULT_LOCALE = 'id'
+SUPPORTED_LOCALES = ('id',)
+
+_cached_views = []
+
+def cached_view(build):
+    """Cache a view builder's result per argument tuple, e.g. (role, locale)"""
+    view = lru_cache(maxsize=None)(build)
+    _cached_views.append(view)
+    return view
+
+def clear_views():
+    """Drop every cached view, call after the menu or config changed"""
+    for view in _cached_views:
+        view.cache_clear()
+
+def user_locale(user):
+    """Locale key of a Telegram user"""
+    language = (getattr(user, 'language_code', None) or '').split('-')[0]
+    return language if language in SUPPORTED_LOCALES else DEFAULT_LOCALE
+
+def user_role(is_admin):
+    """Role key: admin or customer"""
+    return 'admin' if is_admin else 'customer'
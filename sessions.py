@@ -0,0 +1,338 @@
+import os
+import json
+import time
+import atexit
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# ==================== CONFIGURATION ====================
+# Sesi yang tidak dipakai selama ini (detik) dihapus beserta keranjangnya
+SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', str(12 * 3600)))
+# Batas jumlah sesi di memori; sesi yang paling lama tidak dipakai dibuang dulu
+# (dengan SESSION_STORAGE=sqlite sesi itu tetap ada di database)
+MAX_SESSIONS = int(os.getenv('MAX_SESSIONS', '10000'))
+
+# SESSION_STORAGE=sqlite -> keranjang & checkout disimpan di sessions.db,
+#                           tetap ada setelah bot restart (default)
+# SESSION_STORAGE=memory -> hanya di memori, hilang saat restart
+SESSION_STORAGE = os.getenv('SESSION_STORAGE', 'sqlite')
+SESSIONS_DB = os.getenv('SESSIONS_DB', 'sessions.db')
+# Perubahan sesi dikumpulkan dan ditulis sekaligus setiap sekian detik
+SESSION_FLUSH_SECONDS = float(os.getenv('SESSION_FLUSH_SECONDS', '2'))
+
+# ==================== CART ====================
+class Cart:
+    """Cart lines keyed by item id, with a running total.
+
+    lines: item_id -> [qty, unit_price]; the unit price is the menu price
+    when the item was first added, like the price snapshot in an order.
+    """
+
+    __slots__ = ('lines', 'total')
+
+    def __init__(self, lines=()):
+        self.lines = {}
+        self.total = 0
+        for item_id, qty, unit_price in lines:
+            self.add(item_id, unit_price, qty)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def add(self, item_id, unit_price, qty=1):
+        line = self.lines.get(item_id)
+        if line is None:
+            self.lines[item_id] = [qty, unit_price]
+        else:
+            line[0] += qty
+            unit_price = line[1]
+        self.total += qty * unit_price
+
+    def remove(self, item_id, qty=1):
+        """Take up to qty units of an item out; False if it is not in the cart"""
+        line = self.lines.get(item_id)
+        if line is None:
+            return False
+        qty = min(qty, line[0])
+        line[0] -= qty
+        self.total -= qty * line[1]
+        if line[0] == 0:
+            del self.lines[item_id]
+        return True
+
+    def clear(self):
+        self.lines.clear()
+        self.total = 0
+
+    def items(self):
+        """Order lines: [[item_id, qty, unit_price], ...]"""
+        return [[item_id, qty, unit_price] for item_id, (qty, unit_price) in list(self.lines.items())]
+
+    @classmethod
+    def from_stored(cls, items):
+        """Cart from stored order lines, or from a legacy list of menu dicts"""
+        cart = cls()
+        for item in items:
+            if isinstance(item, dict):
+                cart.add(item['id'], item['price'])
+            else:
+                cart.add(item[0], item[2], item[1])
+        return cart
+
+# ==================== SESSIONS ====================
+class Session:
+    """Cart and checkout progress of one user"""
+
+    __slots__ = ('cart', 'step', 'customer_name', 'phone', 'address', 'last_seen')
+
+    def __init__(self):
+        self.cart = Cart()
+        self.step = None
+        self.customer_name = None
+        self.phone = None
+        self.address = None
+        self.last_seen = time.time()
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['cart'] = self.cart.items()
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        session = cls()
+        for name in cls.__slots__:
+            if name in data:
+                setattr(session, name, data[name])
+        session.cart = Cart.from_stored(data.get('cart', ()))
+        return session
+
+# ==================== PERSISTENCE ====================
+SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    user_id INTEGER PRIMARY KEY,
+    last_seen REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_last_seen ON sessions(last_seen);
+"""
+
+
+class SqliteSessionBackend:
+    """Sessions as JSON rows in SQLite (WAL), one row per user"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.executescript(SESSION_SCHEMA)
+
+    def load(self, user_id):
+        """Stored session data of a user, or None"""
+        with self._lock:
+            row = self._conn.execute('SELECT data FROM sessions WHERE user_id = ?', (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_many(self, changes):
+        """Write {user_id: data or None (delete)} in one transaction"""
+        upserts = [(user_id, data['last_seen'], json.dumps(data, separators=(',', ':'), ensure_ascii=False))
+                   for user_id, data in changes.items() if data is not None]
+        deletes = [(user_id,) for user_id, data in changes.items() if data is None]
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany(
+                    'INSERT INTO sessions (user_id, last_seen, data) VALUES (?, ?, ?) '
+                    'ON CONFLICT(user_id) DO UPDATE SET last_seen = excluded.last_seen, data = excluded.data',
+                    upserts)
+                self._conn.executemany('DELETE FROM sessions WHERE user_id = ?', deletes)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def delete_idle(self, before):
+        """Delete sessions last used before a timestamp"""
+        with self._lock:
+            return self._conn.execute('DELETE FROM sessions WHERE last_seen < ?', (before,)).rowcount
+
+# ==================== SESSION STORE ====================
+class SessionStore:
+    """user_id -> Session, evicted after SESSION_TTL_SECONDS idle or beyond MAX_SESSIONS.
+
+    Sessions are kept in least-recently-used order, so expired ones are always
+    at the front and each access only pops what has actually expired.
+
+    With a backend, a session missing from memory is loaded on first access,
+    and every session handed out is marked dirty; dirty sessions are written
+    in one transaction flush_interval seconds later (write-behind), so a
+    handler never waits for the disk. A session pushed out by MAX_SESSIONS
+    stays on disk; one that expired is deleted there too.
+    """
+
+    def __init__(self, ttl=SESSION_TTL_SECONDS, max_sessions=MAX_SESSIONS,
+                 backend=None, flush_interval=SESSION_FLUSH_SECONDS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        # user_id -> Session to write, or None to delete
+        self._dirty = {}
+        # Changes being written right now, still served to lazy loads
+        self._flushing = {}
+        self._flush_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flush_timer = None
+        self.created = 0
+        self.loaded = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, user_id):
+        """Session of a user, or None if there is none (or it expired)"""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(user_id)
+            if session is None and self.backend is not None:
+                session = self._load(user_id, now)
+            if session is not None:
+                session.last_seen = now
+                self._sessions.move_to_end(user_id)
+                self._mark_dirty(user_id, session)
+            return session
+
+    def get_or_create(self, user_id):
+        """Session of a user, started empty if needed"""
+        session = self.get(user_id)
+        if session is None:
+            session = self.reset(user_id)
+        return session
+
+    def reset(self, user_id):
+        """Start a fresh session for a user, dropping the old one"""
+        session = Session()
+        with self._lock:
+            self._sessions.pop(user_id, None)
+            self._sessions[user_id] = session
+            self.created += 1
+            self._mark_dirty(user_id, session)
+            self._evict_lru()
+        return session
+
+    def expire(self):
+        """Drop idle sessions now, also from the backend (memory is swept on every access)"""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+        if self.backend is not None:
+            self.backend.delete_idle(now - self.ttl)
+
+    def _load(self, user_id, now):
+        if user_id in self._dirty or user_id in self._flushing:
+            session = self._dirty[user_id] if user_id in self._dirty else self._flushing[user_id]
+        else:
+            data = self.backend.load(user_id)
+            session = Session.from_dict(data) if data is not None else None
+        if session is None or session.last_seen <= now - self.ttl:
+            return None
+        self._sessions[user_id] = session
+        self.loaded += 1
+        self._evict_lru()
+        return session
+
+    def _expire(self, now):
+        deadline = now - self.ttl
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if session.last_seen > deadline:
+                break
+            del self._sessions[user_id]
+            self.evicted_idle += 1
+            if self.backend is not None:
+                self._mark_dirty(user_id, None)
+
+    def _evict_lru(self):
+        # Still dirty sessions stay queued in _dirty until written
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted_lru += 1
+
+    def _mark_dirty(self, user_id, session):
+        if self.backend is None:
+            return
+        self._dirty[user_id] = session
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        with self._flush_lock:
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self._timer_flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _timer_flush(self):
+        with self._flush_lock:
+            self._flush_timer = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Session write failed, retrying in the next window")
+            self._schedule_flush()
+
+    def flush(self):
+        """Write all dirty sessions to the backend now"""
+        if self.backend is None:
+            return
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._flushing, self._dirty = self._dirty, {}
+            try:
+                # Handlers may change a cart meanwhile; a failure here must also requeue
+                changes = {user_id: session.to_dict() if session is not None else None
+                           for user_id, session in self._flushing.items()}
+                self.backend.save_many(changes)
+            except Exception:
+                with self._lock:
+                    for user_id, session in self._flushing.items():
+                        self._dirty.setdefault(user_id, session)
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def metrics(self):
+        """Live session count and eviction counters"""
+        return {
+            'live': len(self._sessions),
+            'created': self.created,
+            'loaded': self.loaded,
+            'pending_writes': len(self._dirty),
+            'evicted_idle': self.evicted_idle,
+            'evicted_lru': self.evicted_lru,
+        }
+
+
+def open_sessions():
+    """Create the session store selected by SESSION_STORAGE"""
+    if SESSION_STORAGE != 'sqlite':
+        return SessionStore()
+    logger.info(f"🛒 Session storage: sqlite ({SESSIONS_DB})")
+    store = SessionStore(backend=SqliteSessionBackend(SESSIONS_DB))
+    # Last chance for pending session writes; main() also flushes on shutdown
+    atexit.register(store.flush)
+    return store
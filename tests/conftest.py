@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('MENU_FILE', os.path.join(ROOT, 'menu.json'))
+os.environ.setdefault('SESSION_STORAGE', 'memory')
+
+from fake_api import TOKEN, FakeBotAPI, make_update  # noqa: E402,F401 (tests import these from conftest)
+
+
+@pytest.fixture
+def fake_api():
+    api = FakeBotAPI()
+    yield api
+    api.close()
+
+
+STORE_KINDS = ['json', 'journal', 'sqlite']
+
+
+def make_store(kind, directory, commit_window=0):
+    """Order store of ORDER_STORAGE `kind` keeping its files in `directory`"""
+    import order_store
+    path = os.path.join(str(directory), 'orders.json')
+    if kind == 'journal':
+        return order_store.JournalOrderStore(path, commit_window=commit_window)
+    if kind == 'sqlite':
+        return order_store.SqliteOrderStore(os.path.join(str(directory), 'orders.db'),
+                                            commit_window=commit_window)
+    return order_store.JsonOrderStore(path, commit_window=commit_window)
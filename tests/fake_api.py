@@ -0,0 +1,148 @@
+"""Fake Bot API server, shared by the tests and the bench/ scripts"""
+import json
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOKEN = '123456:TEST'
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Bursts of new connections must not be reset by a full listen backlog
+    request_queue_size = 128
+
+
+class FakeBotAPI:
+    """Local stand-in for api.telegram.org.
+
+    Answers getMe, getUpdates (long polling on `updates`), webhook calls and message
+    sends. With limits set it enforces them like Telegram does, answering
+    429 with retry_after: `global_rate` sends in any one second, and per
+    chat a bucket of `chat_burst` refilled at `chat_rate` per second.
+    """
+
+    def __init__(self, latency=0.0, global_rate=None, chat_rate=None, chat_burst=3, connect_delay=0.0):
+        self.latency = latency
+        # Extra wait on each new connection, like a TCP + TLS handshake
+        self.connect_delay = connect_delay
+        self.connections = 0
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.lock = threading.Condition()
+        self.messages = {}       # chat_id -> [text, ...] in delivery order
+        self.calls = []          # (method, params)
+        self.updates = []
+        self.rejected = 0
+        self.fail_next = {}      # chat_id -> number of 429s to answer first
+        self._window = deque()
+        self._buckets = {}
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with api.lock:
+                    api.connections += 1
+                if api.connect_delay:
+                    time.sleep(api.connect_delay)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length)
+                params = json.loads(body) if body and 'json' in self.headers.get('Content-Type', '') else {}
+                code, reply = api.handle(self.path.rsplit('/', 1)[1], params)
+                data = json.dumps(reply).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = _Server(('127.0.0.1', 0), Handler)
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_address[1]}/bot'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def _allowed(self, chat_id):
+        now = time.monotonic()
+        if self.fail_next.get(chat_id):
+            self.fail_next[chat_id] -= 1
+            return False
+        if self.global_rate is not None:
+            while self._window and self._window[0] <= now - 1:
+                self._window.popleft()
+            if len(self._window) >= self.global_rate:
+                return False
+        if self.chat_rate is not None:
+            tokens, stamp = self._buckets.get(chat_id, (self.chat_burst, now))
+            tokens = min(self.chat_burst, tokens + (now - stamp) * self.chat_rate)
+            if tokens < 1:
+                self._buckets[chat_id] = (tokens, now)
+                return False
+            self._buckets[chat_id] = (tokens - 1, now)
+        self._window.append(now)
+        return True
+
+    def handle(self, method, params):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.calls.append((method, params))
+            if method == 'getMe':
+                return 200, {'ok': True, 'result': {'id': 123456, 'is_bot': True, 'first_name': 'Bot',
+                                                    'username': 'test_bot'}}
+            if method == 'getUpdates':
+                offset = int(params.get('offset') or 0)
+                self.updates = [u for u in self.updates if u['update_id'] >= offset]
+                if not self.updates and params.get('timeout'):
+                    # Long polling: answer as soon as an update arrives
+                    self.lock.wait_for(lambda: self.updates[-1:] and self.updates[-1]['update_id'] >= offset,
+                                       float(params['timeout']))
+                    self.updates = [u for u in self.updates if u['update_id'] >= offset]
+                limit = int(params.get('limit') or 100)
+                return 200, {'ok': True, 'result': self.updates[:limit]}
+            if method in ('sendMessage', 'editMessageText'):
+                chat_id = int(params['chat_id'])
+                if not self._allowed(chat_id):
+                    self.rejected += 1
+                    return 429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+                                 'parameters': {'retry_after': 1}}
+                self.messages.setdefault(chat_id, []).append(params['text'])
+                self.lock.notify_all()
+                return 200, {'ok': True, 'result': {'message_id': 1, 'date': 0, 'text': params['text'],
+                                                    'chat': {'id': chat_id, 'type': 'private'}}}
+            return 200, {'ok': True, 'result': True}
+
+    def add_updates(self, updates):
+        """Queue updates for getUpdates, waking a waiting long poll"""
+        with self.lock:
+            self.updates.extend(updates)
+            self.lock.notify_all()
+
+    def wait_for(self, predicate, timeout=10):
+        with self.lock:
+            return self.lock.wait_for(lambda: predicate(self), timeout)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_update(update_id, user_id, text='/help'):
+    """Update JSON of a private text message (a command if text starts with /)"""
+    message = {
+        'message_id': update_id, 'date': int(time.time()), 'text': text,
+        'chat': {'id': user_id, 'type': 'private'},
+        'from': {'id': user_id, 'is_bot': False, 'first_name': 'Budi'},
+    }
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return {'update_id': update_id, 'message': message}
@@ -0,0 +1,55 @@
+import atexit
+import importlib
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import order_store
+from conftest import make_store
+
+ADMIN_ID = 7521156999
+
+
+@pytest.fixture
+def admin_bot(tmp_path, monkeypatch):
+    # The bot opens its stores in the working directory when imported
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module('admin_bot')
+    # Its store has a relative path: flushing it at exit would write in the repo
+    atexit.unregister(module.orders_store.flush)
+    monkeypatch.setattr(module, 'orders_store', make_store('json', tmp_path))
+    monkeypatch.setattr(module, 'order_archive', order_store.OrderArchive(str(tmp_path / 'archive')))
+    return module
+
+
+def _callback(data):
+    shown = []
+    query = SimpleNamespace(data=data, from_user=SimpleNamespace(id=ADMIN_ID), answer=lambda *a, **k: None,
+                            edit_message_text=lambda text, **kwargs: shown.append(text))
+    return SimpleNamespace(callback_query=query), shown
+
+
+def _put(store, order_id, status, timestamp, total=10000):
+    order = order_store.Order(order_id=order_id, user_id=1, customer_name='Budi', phone='08123',
+                              address='Jl. Mawar 1', items=[['M001', 1, total]], total=total,
+                              status=status, timestamp=timestamp).to_dict()
+    store.insert_order(order_id, order)
+
+
+def test_totals_keep_archived_orders(admin_bot):
+    old = (datetime.now() - timedelta(days=3)).isoformat()
+    for n in range(3):
+        _put(admin_bot.orders_store, f'OLD{n}', 'selesai', old)
+    _put(admin_bot.orders_store, 'NEW1', 'baru', datetime.now().isoformat(), total=5000)
+    assert order_store.archive_completed(admin_bot.orders_store, admin_bot.order_archive) == 3
+
+    update, shown = _callback('admin_stats')
+    admin_bot.admin_stats(update, None)
+    assert '• Total Pesanan: 4' in shown[-1]
+    assert '• Total Pendapatan: Rp 35,000' in shown[-1]
+    assert '• ✅ Selesai: 3' in shown[-1]
+
+    update, shown = _callback('admin_orders')
+    admin_bot.admin_list_orders(update, None)
+    assert '• Total Pesanan: 4' in shown[-1]
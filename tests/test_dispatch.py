@@ -0,0 +1,83 @@
+import threading
+import time
+
+from telegram import Update
+from telegram.ext import MessageHandler, Filters
+
+import dispatch
+from conftest import TOKEN, make_update
+
+
+def test_executor_runs_each_key_in_order_one_at_a_time():
+    executor = dispatch.PerUserExecutor(8)
+    lock = threading.Lock()
+    running = set()
+    overlaps = []
+    seen = {}
+
+    def task(key, n):
+        with lock:
+            if key in running:
+                overlaps.append(key)
+            running.add(key)
+        time.sleep(0.001)
+        with lock:
+            running.discard(key)
+            seen.setdefault(key, []).append(n)
+
+    for n in range(20):
+        for key in range(10):
+            executor.submit(key, task, key, n)
+    executor.shutdown()
+    assert overlaps == []
+    assert seen == {key: list(range(20)) for key in range(10)}
+
+
+def test_busy_user_does_not_hold_back_others():
+    executor = dispatch.PerUserExecutor(2)
+    finished = {}
+
+    def task(key):
+        time.sleep(0.01)
+        finished[key] = time.monotonic()
+
+    for _ in range(30):
+        executor.submit('busy', task, 'busy')
+    start = time.monotonic()
+    executor.submit('other', task, 'other')
+    executor.shutdown()
+    assert finished['other'] - start < 0.2
+    assert finished['busy'] > finished['other']
+
+
+def test_failing_task_does_not_stop_the_key():
+    executor = dispatch.PerUserExecutor(2)
+    done = []
+    executor.submit('a', lambda: 1 / 0)
+    executor.submit('a', done.append, 'next')
+    executor.shutdown()
+    assert done == ['next']
+
+
+def test_dispatcher_keeps_per_user_order(fake_api):
+    updater = dispatch.make_updater(TOKEN, workers=4)
+    updater.bot.base_url = fake_api.base_url + TOKEN
+    seen = {}
+    lock = threading.Lock()
+
+    def handle(update, context):
+        time.sleep(0.002)
+        with lock:
+            seen.setdefault(update.effective_user.id, []).append(update.update_id)
+
+    updater.dispatcher.add_handler(MessageHandler(Filters.text, handle))
+    thread = threading.Thread(target=updater.dispatcher.start, daemon=True)
+    thread.start()
+    for n in range(100):
+        updater.update_queue.put(Update.de_json(make_update(n, 1000 + n % 5, text='halo'), updater.bot))
+    deadline = time.monotonic() + 10
+    while sum(map(len, seen.values())) < 100 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    updater.dispatcher.stop()
+    dispatch.finish_updates(updater)
+    assert seen == {1000 + u: list(range(u, 100, 5)) for u in range(5)}
@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+
+import pytest
+
+import order_store
+from conftest import STORE_KINDS, make_store
+
+IDS_PER_PROCESS = 3000
+
+
+def _allocate(results):
+    # Identical containers: every bot process is pid 1 in its own namespace
+    getpid, os.getpid = os.getpid, lambda: 1
+    try:
+        allocator = order_store.OrderIdAllocator()
+    finally:
+        os.getpid = getpid
+    results.put([allocator.next_id() for _ in range(IDS_PER_PROCESS)])
+
+
+def test_processes_with_the_same_pid_never_collide():
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    workers = [context.Process(target=_allocate, args=(results,)) for _ in range(6)]
+    for worker in workers:
+        worker.start()
+    ids = [order_id for _ in workers for order_id in results.get(timeout=60)]
+    for worker in workers:
+        worker.join()
+    assert len(ids) == len(set(ids)) == 6 * IDS_PER_PROCESS
+
+
+def test_ids_are_unique_and_ordered_within_a_process():
+    allocator = order_store.OrderIdAllocator(worker_id='w1')
+    ids = [allocator.next_id() for _ in range(5000)]
+    assert len(set(ids)) == len(ids)
+    assert all(order_id.startswith('ORD') and '-w1-' in order_id for order_id in ids)
+
+
+def _order(user_id, total=10000):
+    return order_store.Order(order_id='', user_id=user_id, customer_name='Budi', phone='08123',
+                             address='Jl. Mawar 1', items=[['nasi_goreng', 1, total]], total=total).to_dict()
+
+
+@pytest.mark.parametrize('kind', STORE_KINDS)
+def test_insert_never_replaces_an_order(kind, tmp_path):
+    store = make_store(kind, tmp_path)
+    store.insert_order('ORD1', _order(1))
+    with pytest.raises(order_store.DuplicateOrderError):
+        store.insert_order('ORD1', _order(2, total=5))
+    assert store.get_order('ORD1')['user_id'] == 1
+
+    # Seen from another process too, and the counters only count the first one
+    reopened = make_store(kind, tmp_path)
+    assert reopened.get_order('ORD1')['user_id'] == 1
+    with pytest.raises(order_store.DuplicateOrderError):
+        reopened.insert_order('ORD1', _order(3))
+    day = reopened.get_order('ORD1')['timestamp'][:10]
+    assert reopened.stats(day)['total_orders'] == 1
+
+
+@pytest.mark.parametrize('worker_id', ['worker_1', 'a' * 9, '4f1c2b9e-7d3a-4c61-9b1e-2a5f8c0d6e71', 'kasir 1', 'düsseldf'])
+def test_worker_ids_unfit_for_callback_data_are_refused(worker_id, monkeypatch):
+    with pytest.raises(ValueError):
+        order_store.OrderIdAllocator(worker_id=worker_id)
+    monkeypatch.setenv('WORKER_ID', worker_id)
+    with pytest.raises(ValueError):
+        order_store.OrderIdAllocator()
+
+
+@pytest.mark.parametrize('worker_id', [None, 'w1', 'kasir-01', 'ABCDEFGH'])
+def test_order_ids_survive_admin_callback_data(worker_id):
+    order_id = order_store.OrderIdAllocator(worker_id=worker_id).next_id()
+    data = f"admin_status_processing_{order_id}"
+    assert len(data.encode()) <= 64
+    assert data.split('_')[-1] == order_id
@@ -0,0 +1,49 @@
+import multiprocessing
+
+import pytest
+
+import order_store
+from conftest import STORE_KINDS, make_store
+
+PROCESSES = 4
+ORDERS_PER_PROCESS = 60
+
+
+def _checkout_and_update(kind, directory, commit_window, worker, start):
+    store = make_store(kind, directory, commit_window)
+    allocator = order_store.OrderIdAllocator(worker_id=f'w{worker}')
+    start.wait()
+    created = []
+    for n in range(ORDERS_PER_PROCESS):
+        order_id = allocator.next_id()
+        order = order_store.Order(order_id=order_id, user_id=worker, customer_name='Budi', phone='08123',
+                                  address='Jl. Mawar 1', items=[['nasi_goreng', 1, 25000]], total=25000)
+        store.insert_order(order_id, order.to_dict())
+        created.append(order_id)
+        # Status changes of earlier orders interleave with the other processes' checkouts
+        if n % 3 == 2:
+            store.update_status(created[n - 2], 'diproses', durable=n % 2 == 0)
+    store.flush()
+
+
+@pytest.mark.parametrize('commit_window', [0, 0.02])
+@pytest.mark.parametrize('kind', STORE_KINDS)
+def test_no_orders_lost_across_processes(kind, commit_window, tmp_path):
+    make_store(kind, tmp_path).flush()
+    context = multiprocessing.get_context('spawn')
+    start = context.Event()
+    workers = [context.Process(target=_checkout_and_update, args=(kind, str(tmp_path), commit_window, i, start))
+               for i in range(PROCESSES)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    for worker in workers:
+        worker.join(timeout=120)
+        assert worker.exitcode == 0
+
+    orders = make_store(kind, tmp_path).load()
+    assert len(orders) == PROCESSES * ORDERS_PER_PROCESS
+    for worker in range(PROCESSES):
+        mine = [order for order in orders.values() if order['user_id'] == worker]
+        assert len(mine) == ORDERS_PER_PROCESS
+        assert sum(order['status'] == 'diproses' for order in mine) == ORDERS_PER_PROCESS // 3
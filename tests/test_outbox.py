@@ -0,0 +1,107 @@
+import threading
+
+from telegram.utils.request import Request
+
+import outbox
+from conftest import FakeBotAPI, TOKEN
+
+
+def _finish(box, job, result='ok'):
+    chat_id, entry = job
+    entry[2][3].set_result(result)
+    box._done(chat_id, entry, entry[2][3], None)
+
+
+def test_sweep_skips_ready_entries_of_forgotten_chats():
+    # No sender threads: the test drives the scheduler itself
+    box = outbox.Outbox(global_rate=1e6, chat_rate=1e6, threads=0)
+    with box._cond:
+        box.submit('A', outbox.LOW, str)
+        box.submit('A', outbox.URGENT, str)
+        _finish(box, box._next_job())
+        _finish(box, box._next_job())
+    # A is idle, but a left-behind (LOW, seq, 'A') entry is still in the ready heap
+    assert any(chat_id == 'A' for _, _, chat_id in box._ready)
+
+    futures = [box.submit(f'chat{i}', outbox.LOW, lambda i=i: i) for i in range(1100)]
+    assert 'A' not in box._chats
+
+    sender = threading.Thread(target=box._run, daemon=True)
+    sender.start()
+    assert [future.result(timeout=10) for future in futures] == list(range(1100))
+    assert sender.is_alive()
+    box.close()
+    sender.join(timeout=10)
+    assert not sender.is_alive()
+
+
+def test_same_chat_in_order_and_urgent_first():
+    box = outbox.Outbox(global_rate=1e6, chat_rate=1e6, threads=0)
+    sent = []
+    with box._cond:
+        for text in ('menu', 'reply'):
+            box.submit(1, outbox.LOW if text == 'menu' else outbox.NORMAL, sent.append, text)
+        box.submit(1, outbox.URGENT, sent.append, 'confirm')
+        box.submit(1, outbox.NORMAL, sent.append, 'reply 2')
+        for _ in range(4):
+            chat_id, entry = box._next_job()
+            fn, args = entry[2][0], entry[2][1]
+            fn(*args)
+            _finish(box, (chat_id, entry))
+    assert sent == ['confirm', 'reply', 'reply 2', 'menu']
+    box.close()
+
+
+def test_queued_edit_is_replaced_by_newer_edit():
+    box = outbox.Outbox(threads=0)
+    with box._cond:
+        first = box.submit(1, outbox.LOW, str, 'menu 0', replace_key=7)
+        second = box.submit(1, outbox.LOW, str, 'menu 1', replace_key=7)
+        assert first is second
+        chat_id, entry = box._next_job()
+        assert entry[2][1] == ('menu 1',)
+    assert box.metrics()['replaced'] == 1
+
+
+def _queued_bot(api, box):
+    return outbox.QueuedBot(TOKEN, base_url=api.base_url, request=Request(con_pool_size=8), outbox=box)
+
+
+def test_rate_limited_fake_api_delivers_everything():
+    api = FakeBotAPI(latency=0.005, global_rate=60, chat_rate=10, chat_burst=3)
+    box = outbox.Outbox(global_rate=50, chat_rate=10, chat_burst=3, threads=4)
+    bot = _queued_bot(api, box)
+    chats = range(1000, 1030)
+    futures = {'edit': [], 'reply': [], 'confirm': []}
+    for chat in chats:
+        for k in range(4):
+            futures['edit'].append(bot.edit_message_text(f'menu {k}', chat_id=chat, message_id=1))
+        futures['reply'].append(bot.send_message(chat, 'reply'))
+        futures['confirm'].append(bot.send_message(chat, 'confirm', priority=outbox.URGENT))
+    box.close()
+    api.close()
+
+    for kind in futures:
+        assert all(future.exception(timeout=0) is None for future in futures[kind]), kind
+    for chat in chats:
+        texts = api.messages[chat]
+        assert texts.count('confirm') == 1 and texts.count('reply') == 1
+        # Queued edits of the message collapse into its latest text
+        assert [text for text in texts if text.startswith('menu')][-1] == 'menu 3'
+    metrics = box.metrics()
+    assert metrics['queued'] == 0 and metrics['failed'] == 0
+    assert metrics['sent'] == sum(len(texts) for texts in api.messages.values())
+
+
+def test_retry_after_is_honoured():
+    api = FakeBotAPI()
+    api.fail_next[42] = 1
+    box = outbox.Outbox(threads=1)
+    bot = _queued_bot(api, box)
+    future = bot.send_message(42, 'hello')
+    assert future.result(timeout=10).text == 'hello'
+    box.close()
+    api.close()
+    assert api.rejected == 1
+    assert box.metrics()['rate_limited'] == 1
+    assert api.messages[42] == ['hello']
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+import sessions
+
+
+class _MutatedCart(sessions.Cart):
+    """Cart whose first read fails like one changed by a handler mid-iteration"""
+
+    __slots__ = ('failures',)
+
+    def items(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('dictionary changed size during iteration')
+        return super().items()
+
+
+def _store(tmp_path):
+    return sessions.SessionStore(backend=sessions.SqliteSessionBackend(str(tmp_path / 'sessions.db')),
+                                 flush_interval=60)
+
+
+def test_failed_snapshot_keeps_the_session_dirty(tmp_path):
+    store = _store(tmp_path)
+    session = store.get_or_create(42)
+    session.cart = _MutatedCart([['nasi_goreng', 2, 25000]])
+    session.cart.failures = 1
+
+    with pytest.raises(RuntimeError):
+        store.flush()
+    assert store.metrics()['pending_writes'] == 1
+    assert store._flushing == {}
+
+    store.flush()
+    assert store.metrics()['pending_writes'] == 0
+    reloaded = _store(tmp_path).get(42)
+    assert reloaded.cart.items() == [['nasi_goreng', 2, 25000]]
+
+
+def test_flush_while_carts_change(tmp_path):
+    store = _store(tmp_path)
+    carts = [store.get_or_create(user_id).cart for user_id in range(50)]
+    stop = threading.Event()
+
+    def shop():
+        n = 0
+        while not stop.is_set():
+            cart = carts[n % len(carts)]
+            cart.add(f'item{n % 7}', 1000)
+            cart.remove(f'item{(n + 3) % 7}')
+            n += 1
+
+    shopper = threading.Thread(target=shop)
+    shopper.start()
+    try:
+        for _ in range(50):
+            for user_id in range(50):
+                store.get(user_id)
+            store.flush()
+    finally:
+        stop.set()
+        shopper.join()
+    for user_id in range(50):
+        store.get(user_id)
+    store.flush()
+    assert store.metrics()['pending_writes'] == 0
+    reopened = _store(tmp_path)
+    for user_id in range(50):
+        assert reopened.get(user_id).cart.total == store.get(user_id).cart.total
@@ -0,0 +1,73 @@
+import json
+import socket
+import threading
+
+import pytest
+from telegram import Bot
+
+import webhook
+from conftest import TOKEN, make_update
+
+SECRET = 'test-secret'
+
+
+@pytest.fixture
+def server():
+    received = []
+    arrived = threading.Condition()
+
+    def deliver(updates):
+        with arrived:
+            received.extend(updates)
+            arrived.notify_all()
+
+    server = webhook.WebhookServer(Bot(TOKEN), deliver, listen='127.0.0.1', port=0,
+                                   path='/telegram', secret=SECRET)
+    server.received = received
+    server.arrived = arrived
+    server.start()
+    yield server
+    server.stop()
+
+
+def _post(server, path='/telegram', secret=SECRET, body=b'{}', length=None):
+    """Send one raw POST and return the status code"""
+    head = [f'POST {path} HTTP/1.1', 'Host: localhost', 'Content-Type: application/json']
+    if secret is not None:
+        head.append(f'X-Telegram-Bot-Api-Secret-Token: {secret}')
+    if length != 'omit':
+        head.append(f'Content-Length: {len(body) if length is None else length}')
+    with socket.create_connection(('127.0.0.1', server.port), timeout=5) as sock:
+        sock.sendall('\r\n'.join(head).encode() + b'\r\n\r\n' + body)
+        status_line = sock.makefile('rb').readline()
+    return int(status_line.split()[1])
+
+
+def test_updates_are_delivered_in_update_id_order(server):
+    for update_id in (3, 1, 2):
+        body = json.dumps(make_update(update_id, 42)).encode()
+        assert _post(server, body=body) == 200
+    with server.arrived:
+        assert server.arrived.wait_for(lambda: len(server.received) == 3, timeout=5)
+    assert sorted(update.update_id for update in server.received) == [1, 2, 3]
+    assert server.received[0].message.text == '/help'
+
+
+@pytest.mark.parametrize('secret', [None, '', 'wrong-secret'])
+def test_wrong_secret_token_is_rejected(server, secret):
+    assert _post(server, secret=secret, body=json.dumps(make_update(1, 42)).encode()) == 403
+    assert server.received == []
+
+
+def test_unknown_path_is_not_found(server):
+    assert _post(server, path='/other') == 404
+
+
+def test_bad_json_is_rejected(server):
+    assert _post(server, body=b'{not json') == 400
+
+
+@pytest.mark.parametrize('length, code', [('omit', 411), ('-1', 400), ('abc', 400), ('1_0', 400),
+                                          (str(webhook.MAX_UPDATE_BYTES + 1), 413)])
+def test_bad_content_length_is_answered(server, length, code):
+    assert _post(server, length=length) == code
@@ -0,0 +1,166 @@
+import os
+import hmac
+import json
+import queue
+import signal
+import logging
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+# ==================== CONFIGURATION ====================
+# UPDATE_MODE=polling -> bot menanyakan update ke Telegram (default)
+# UPDATE_MODE=webhook -> Telegram mengirim update ke WEBHOOK_URL + WEBHOOK_PATH
+UPDATE_MODE = os.getenv('UPDATE_MODE', 'polling')
+# Alamat publik HTTPS bot, contoh: https://restoran-bot.up.railway.app
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+# Railway mengisi PORT sendiri
+WEBHOOK_PORT = int(os.getenv('PORT', '8443'))
+# Dikirim Telegram di header X-Telegram-Bot-Api-Secret-Token; tanpa WEBHOOK_SECRET
+# dibuat acak setiap start (webhook juga didaftarkan ulang setiap start)
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or secrets.token_urlsafe(32)
+# Jumlah koneksi paralel yang boleh dibuka Telegram ke webhook (1-100)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+
+MAX_UPDATE_BYTES = 1 << 20
+
+# ==================== WEBHOOK SERVER ====================
+class _WebhookRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive: Telegram reuses its connections
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server.webhook
+        if self.path != server.path:
+            return self._reply(404)
+        token = self.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+        if not hmac.compare_digest(token.encode(), server.secret.encode()):
+            return self._reply(403)
+        length = self.headers.get('Content-Length')
+        if length is None:
+            return self._reply(411)
+        # Digits only: int() would also take '-1' (read until EOF) or ' 1_0 '
+        if not (length.isascii() and length.isdigit()):
+            return self._reply(400)
+        length = int(length)
+        if length > MAX_UPDATE_BYTES:
+            return self._reply(413)
+        try:
+            data = json.loads(self.rfile.read(length))
+        except ValueError:
+            return self._reply(400)
+        # Answer first; decoding and handling happen on the feeder thread
+        self._reply(200)
+        server.incoming.put(data)
+
+    def _reply(self, code):
+        if code != 200:
+            # The request body may be unread; do not reuse the connection
+            self.close_connection = True
+        self.send_response(code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug("Webhook %s - %s", self.address_string(), format % args)
+
+
+class WebhookServer:
+    """Local HTTP endpoint for Telegram's webhook POSTs.
+
+    Request threads only check the path and secret token, parse the JSON and
+    answer 200. One feeder thread takes everything that has arrived since
+    its last pass as a batch, turns it into Updates ordered by update_id
+    (parallel connections can deliver out of order) and hands the batch to
+    `deliver`.
+    """
+
+    def __init__(self, bot, deliver, listen=WEBHOOK_LISTEN, port=WEBHOOK_PORT,
+                 path=WEBHOOK_PATH, secret=WEBHOOK_SECRET):
+        self.bot = bot
+        self.deliver = deliver
+        self.path = path
+        self.secret = secret
+        self.incoming = queue.Queue()
+        self.httpd = ThreadingHTTPServer((listen, port), _WebhookRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.webhook = self
+        self._threads = []
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def start(self):
+        for target, name in ((self.httpd.serve_forever, 'webhook'), (self._feed, 'webhook-feeder')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop accepting requests and deliver what already arrived"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.incoming.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _feed(self):
+        while True:
+            batch = [self.incoming.get()]
+            while True:
+                try:
+                    batch.append(self.incoming.get_nowait())
+                except queue.Empty:
+                    break
+            updates = []
+            for data in batch:
+                if data is None:
+                    continue
+                try:
+                    updates.append(Update.de_json(data, self.bot))
+                except Exception:
+                    logger.exception(f"Ignoring malformed update: {str(data)[:80]}")
+            if updates:
+                updates.sort(key=lambda update: update.update_id)
+                self.deliver(updates)
+            if None in batch:
+                return
+
+
+def start_webhook(bot, deliver):
+    """Register the webhook with Telegram and start serving it"""
+    if not WEBHOOK_URL:
+        raise RuntimeError("UPDATE_MODE=webhook needs WEBHOOK_URL")
+    server = WebhookServer(bot, deliver)
+    server.start()
+    bot.set_webhook(url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH, secret_token=WEBHOOK_SECRET,
+                    max_connections=WEBHOOK_MAX_CONNECTIONS)
+    logger.info(f"🌐 Webhook: {WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH} (listening on port {server.port})")
+    return server
+
+
+def run_webhook(updater):
+    """Threaded runtime: serve the webhook into the dispatcher until SIGINT/SIGTERM"""
+    def deliver(updates):
+        for update in updates:
+            updater.update_queue.put(update)
+
+    threading.Thread(target=updater.dispatcher.start, name='dispatcher', daemon=True).start()
+    updater.job_queue.start()
+    server = start_webhook(updater.bot, deliver)
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    stop.wait()
+
+    logger.info("Stopping webhook...")
+    server.stop()
+    # The webhook stays registered: Telegram keeps the updates until the next start
+    updater.stop()